@@ -1,22 +1,13 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
 import json
 import os
 from datetime import datetime
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    openai = None
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from collections import defaultdict
+import dataclasses
 # Import dei moduli utility (caricamento dinamico per evitare errori)
 import sys
-import os
 
 # Aggiungi la directory utils al path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
@@ -29,10 +20,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Configurazione OpenAI
-if OPENAI_AVAILABLE and 'OPENAI_API_KEY' in os.environ:
-    openai.api_key = os.environ['OPENAI_API_KEY']
-
 # Inizializzazione componenti
 @st.cache_resource
 def initialize_components():
@@ -50,17 +37,96 @@ def initialize_components():
         return None, None, None, None, None
 
 # Caricamento dati
-@st.cache_data
+QUESTIONS_FILE = 'data/knowledge-valorisation-self-assessment-tool-with-the-case-of-bologna.xlsx'
+LIKERT_SCALE_LABELS = {
+    1: "Strongly disagree", 2: "Disagree", 3: "Somewhat disagree",
+    4: "Neutral", 5: "Somewhat agree", 6: "Agree", 7: "Strongly agree"
+}
+
 def load_questions():
-    """Carica le domande dal file Excel"""
+    """Carica le domande, invalidando la cache quando il file Excel cambia"""
+    try:
+        source_mtime = os.path.getmtime(QUESTIONS_FILE)
+    except OSError:
+        source_mtime = None
+    return _load_questions_cached(QUESTIONS_FILE, source_mtime)
+
+@st.cache_resource(show_spinner=False)
+def _load_questions_cached(file_path, source_mtime):
+    """Carica le domande (QuestionManager usa la copia Parquet del foglio se aggiornata)
+    
+    Le domande sono condivise in sola lettura tra le sessioni: cache_resource
+    le restituisce senza la copia (pickle) che cache_data fa ad ogni chiamata.
+    """
     try:
         from question_manager import QuestionManager
         question_manager = QuestionManager()
-        questions = question_manager.load_questions_from_excel('data/knowledge-valorisation-self-assessment-tool-with-the-case-of-bologna.xlsx')
-        return questions
+        questions = question_manager.load_questions_from_excel(file_path, engine='calamine')
+        return _freeze_questions(_prepare_questions(questions))
     except Exception as e:
         st.error(f"Errore nel caricamento delle domande: {e}")
-        return []
+        return ()
+
+def _prepare_questions(questions):
+    """Normalizza una sola volta il nome del canale per la visualizzazione"""
+    prepared = []
+    for question in questions:
+        # Nome del canale senza il prefisso numerico ("n.1 ...")
+        channel = question.channel
+        if channel and channel.startswith('n.') and ' ' in channel:
+            question = dataclasses.replace(question, channel=channel.split(' ', 1)[1])
+        prepared.append(question)
+    return prepared
+
+def _freeze_questions(questions):
+    """Rende immutabile la lista (le domande lo sono già), perché condivisa tra tutte le sessioni"""
+    return tuple(questions)
+
+FACTOR_KEYS = ['env', 'org', 'ind']
+
+# Codifica della risposta per tipo di domanda, indicizzata da is_likert:
+# Yes/No -> 1/0, Likert -> valore 1-7
+_YESNO_CODES = {'Yes': 1.0, 'No': 0.0}
+_RESPONSE_ENCODERS = (lambda response: _YESNO_CODES.get(response, 0.0), float)
+
+def load_score_index():
+    """Restituisce gli indici per il calcolo vettoriale dei punteggi"""
+    try:
+        source_mtime = os.path.getmtime(QUESTIONS_FILE)
+    except OSError:
+        source_mtime = None
+    return _build_score_index(QUESTIONS_FILE, source_mtime)
+
+@st.cache_resource
+def _build_score_index(file_path, source_mtime):
+    """Precalcola canale, fattore e tipo di ogni domanda come array NumPy"""
+    questions = _load_questions_cached(file_path, source_mtime)
+    questions_df = pd.DataFrame({
+        'channel': [question.channel for question in questions],
+        'factor': [question.factor for question in questions],
+        'type': [question.type for question in questions]
+    }, dtype=object)
+    
+    channels = questions_df['channel'].fillna('Unknown')
+    
+    # Colonne categoriche: i codici sono gli indici di gruppo per np.bincount
+    questions_df['channel'] = pd.Categorical(channels, categories=pd.unique(channels))
+    questions_df['factor'] = pd.Categorical(questions_df['factor'], categories=FACTOR_KEYS)
+    questions_df['type'] = questions_df['type'].astype('category')
+    
+    # I tipi sono fissi dopo il caricamento: il punteggio 1-7 di ogni domanda è
+    # codice * scala + offset (Likert: valore; Yes = 1 -> 7, No = 0 -> 1)
+    is_likert = (questions_df['type'] == 'likert').to_numpy(dtype=bool)
+    
+    return {
+        'channel_ids': questions_df['channel'].cat.codes.to_numpy(dtype=np.intp),
+        'channel_names': list(questions_df['channel'].cat.categories),
+        'factor_ids': questions_df['factor'].cat.codes.to_numpy(dtype=np.intp),
+        'is_likert': is_likert,
+        'score_scale': np.where(is_likert, 1.0, 6.0),
+        'score_offset': np.where(is_likert, 0.0, 1.0),
+        'total_questions': len(questions)
+    }
 
 def initialize_session_state():
     """Inizializza lo stato della sessione"""
@@ -70,14 +136,22 @@ def initialize_session_state():
     if 'user_info' not in st.session_state:
         st.session_state.user_info = {}
     
-    if 'responses' not in st.session_state:
-        st.session_state.responses = {}
-    
     if 'current_question_index' not in st.session_state:
         st.session_state.current_question_index = 0
     
     if 'assessment_completed' not in st.session_state:
         st.session_state.assessment_completed = False
+    
+    # Somme e conteggi per canale/fattore aggiornati ad ogni risposta
+    if 'channel_sum' not in st.session_state:
+        reset_score_totals()
+
+def ensure_response_state(n_questions):
+    """Alloca risposte e commenti al primo uso, così le pagine senza domande non caricano il file"""
+    # Risposte per indice di domanda: Likert 1-7, Yes = 1 / No = 0, NaN se mancante
+    if 'resp_arr' not in st.session_state:
+        st.session_state.resp_arr = np.full(n_questions, np.nan)
+        st.session_state.comments = [""] * n_questions
 
 def render_sidebar():
     """Renderizza la sidebar di navigazione"""
@@ -198,6 +272,7 @@ def render_assessment_page():
     if not questions:
         st.error("❌ Impossibile caricare le domande. Contatta il supporto.")
         return
+    ensure_response_state(len(questions))
     
     # Inizializza l'indice della domanda corrente
     if 'current_question_index' not in st.session_state:
@@ -217,94 +292,92 @@ def render_assessment_page():
     # Informazioni di contesto
     col1, col2 = st.columns(2)
     with col1:
-        channel_name = current_question.get('channel', 'N/A')
-        if channel_name and channel_name.startswith('n.'):
-            channel_name = channel_name.split(' ', 1)[1] if ' ' in channel_name else channel_name
+        channel_name = current_question.channel
         st.markdown(f"**🎯 Canale:** {channel_name}")
     with col2:
-        factor_name = current_question.get('factor', 'N/A')
-        factor_display = {
-            'env': 'Environmental',
-            'org': 'Organizational', 
-            'ind': 'Individual'
-        }.get(factor_name, factor_name)
+        factor_display = current_question.factor_display
         st.markdown(f"**📊 Fattore:** {factor_display}")
     
     # Testo della domanda
     st.markdown("### 📋 Domanda")
-    st.markdown(f"*{current_question['question']}*")
+    st.markdown(f"*{current_question.question}*")
     
     # Input per la risposta
     response_key = f"q_{st.session_state.current_question_index}"
+    comment_key = f"comment_{st.session_state.current_question_index}"
+    previous_response = get_response(st.session_state.current_question_index)
     
-    st.markdown("### 💭 La tua risposta")
-    
-    if current_question['type'] == 'likert':
-        # Scala Likert
-        scale_labels = current_question.get('scale_labels', {
-            1: "Strongly disagree", 2: "Disagree", 3: "Somewhat disagree",
-            4: "Neutral", 5: "Somewhat agree", 6: "Agree", 7: "Strongly agree"
-        })
+    # Il form rimanda il rerun dello script all'invio: click e digitazione non lo riattivano
+    with st.form(key=f"q_form_{st.session_state.current_question_index}"):
+        st.markdown("### 💭 La tua risposta")
         
-        response = st.radio(
-            "Seleziona il tuo livello di accordo:",
-            options=[1, 2, 3, 4, 5, 6, 7],
-            format_func=lambda x: f"{x} - {scale_labels.get(x, '')}",
-            key=response_key,
-            index=st.session_state.responses.get(response_key, 4) - 1 if st.session_state.responses.get(response_key) else 3,
-            horizontal=True
-        )
+        if current_question.type == 'likert':
+            # Scala Likert
+            scale_labels = current_question.scale_labels or LIKERT_SCALE_LABELS
+            
+            response = st.radio(
+                "Seleziona il tuo livello di accordo:",
+                options=[1, 2, 3, 4, 5, 6, 7],
+                format_func=lambda x: f"{x} - {scale_labels.get(x, '')}",
+                key=response_key,
+                index=int(previous_response) - 1 if previous_response is not None else 3,
+                horizontal=True
+            )
+            
+        else:  # yes/no
+            response = st.radio(
+                "Seleziona la tua risposta:",
+                options=['Yes', 'No'],
+                key=response_key,
+                index=1 if previous_response == 'No' else 0,
+                horizontal=True
+            )
         
-    else:  # yes/no
-        response = st.radio(
-            "Seleziona la tua risposta:",
-            options=['Yes', 'No'],
-            key=response_key,
-            index=0 if st.session_state.responses.get(response_key) == 'Yes' else 1 if st.session_state.responses.get(response_key) == 'No' else 0,
-            horizontal=True
+        # Campo aperto per commenti
+        comment = st.text_area(
+            "💬 Commenti aggiuntivi (opzionale):",
+            value=st.session_state.comments[st.session_state.current_question_index],
+            key=comment_key,
+            height=100,
+            placeholder="Aggiungi qui eventuali commenti, contesto o spiegazioni aggiuntive..."
         )
-    
-    # Campo aperto per commenti
-    comment_key = f"comment_{st.session_state.current_question_index}"
-    comment = st.text_area(
-        "💬 Commenti aggiuntivi (opzionale):",
-        value=st.session_state.responses.get(comment_key, ''),
-        key=comment_key,
-        height=100,
-        placeholder="Aggiungi qui eventuali commenti, contesto o spiegazioni aggiuntive..."
-    )
-    
-    # Salva le risposte
-    st.session_state.responses[response_key] = response
-    if comment:
-        st.session_state.responses[comment_key] = comment
-    
-    st.markdown("---")
-    
-    # Navigazione
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col1:
-        if st.session_state.current_question_index > 0:
-            if st.button("⬅️ Precedente", use_container_width=True):
-                st.session_state.current_question_index -= 1
-                st.rerun()
-    
-    with col2:
-        # Mostra canale/fattore corrente
-        st.markdown(f"<div style='text-align: center; color: #666;'><small>{channel_name} | {factor_display}</small></div>", unsafe_allow_html=True)
-    
-    with col3:
-        if st.session_state.current_question_index < len(questions) - 1:
-            if st.button("Successiva ➡️", use_container_width=True):
-                st.session_state.current_question_index += 1
-                st.rerun()
+        
+        st.markdown("---")
+        
+        # Navigazione
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        previous_clicked = next_clicked = complete_clicked = False
+        
+        with col1:
+            if st.session_state.current_question_index > 0:
+                previous_clicked = st.form_submit_button("⬅️ Precedente", use_container_width=True)
+        
+        with col2:
+            # Mostra canale/fattore corrente
+            st.markdown(f"<div style='text-align: center; color: #666;'><small>{channel_name} | {factor_display}</small></div>", unsafe_allow_html=True)
+        
+        with col3:
+            if st.session_state.current_question_index < len(questions) - 1:
+                next_clicked = st.form_submit_button("Successiva ➡️", use_container_width=True)
+            else:
+                complete_clicked = st.form_submit_button("✅ Completa Assessment", type="primary", use_container_width=True)
+    
+    if previous_clicked or next_clicked or complete_clicked:
+        # Salva le risposte
+        record_response(st.session_state.current_question_index, response)
+        if comment:
+            st.session_state.comments[st.session_state.current_question_index] = comment
+        
+        if previous_clicked:
+            st.session_state.current_question_index -= 1
+        elif next_clicked:
+            st.session_state.current_question_index += 1
         else:
-            if st.button("✅ Completa Assessment", type="primary", use_container_width=True):
-                st.session_state.assessment_completed = True
-                st.session_state.current_page = 'Results'
-                st.success("🎉 Assessment completato! Generazione risultati...")
-                st.rerun()
+            st.session_state.assessment_completed = True
+            st.session_state.current_page = 'Results'
+            st.success("🎉 Assessment completato! Generazione risultati...")
+        st.rerun()
     
     # Sidebar con riepilogo progresso
     with st.sidebar:
@@ -313,7 +386,7 @@ def render_assessment_page():
         st.caption(f"{st.session_state.current_question_index + 1}/{len(questions)} domande completate")
         
         # Mostra risposte date
-        answered = len([k for k in st.session_state.responses.keys() if k.startswith('q_')])
+        answered = int(np.count_nonzero(~np.isnan(st.session_state.resp_arr)))
         st.metric("Risposte date", answered, f"{answered}/{len(questions)}")
         
         # Quick navigation (opzionale)
@@ -340,7 +413,7 @@ def render_results_page():
         return
     
     # Calcola i punteggi
-    scores = calculate_scores()
+    scores = calculate_scores(load_score_index(), st.session_state.get('resp_arr'))
     
     # Mostra punteggi principali
     col1, col2, col3 = st.columns(3)
@@ -358,8 +431,8 @@ def render_results_page():
     st.subheader("📈 Punteggi per Canale")
     
     # Grafico radar
-    fig = create_radar_chart(scores['by_channel'])
-    st.plotly_chart(fig, use_container_width=True)
+    fig_json = create_radar_chart(scores['by_channel'])
+    st.plotly_chart(json.loads(fig_json), use_container_width=True)
     
     # Tabella dettagliata
     st.subheader("📋 Dettaglio Punteggi")
@@ -375,7 +448,7 @@ def render_results_page():
     
     # Insights AI
     st.subheader("🤖 Insights AI-Generated")
-    insights = generate_insights(scores, st.session_state.responses)
+    insights = generate_insights(scores)
     st.markdown(insights)
     
     # Download risultati
@@ -387,7 +460,7 @@ def render_results_page():
             results_json = json.dumps({
                 'user_info': st.session_state.user_info,
                 'scores': scores,
-                'responses': st.session_state.responses,
+                'responses': get_responses_dict(),
                 'timestamp': datetime.now().isoformat()
             }, indent=2)
             st.download_button(
@@ -416,7 +489,7 @@ def render_dashboard_page():
         return
     
     # Metriche avanzate
-    scores = calculate_scores()
+    scores = calculate_scores(load_score_index(), st.session_state.get('resp_arr'))
     
     # Confronto con benchmark
     st.subheader("🎯 Confronto con Benchmark Bologna")
@@ -431,12 +504,12 @@ def render_dashboard_page():
     }
     
     # Grafico comparativo
-    fig = create_comparison_chart(scores['by_channel'], bologna_scores)
-    st.plotly_chart(fig, use_container_width=True)
+    fig_json = create_comparison_chart(scores['by_channel'], bologna_scores)
+    st.plotly_chart(json.loads(fig_json), use_container_width=True)
     
     # Analisi per fattore
     st.subheader("🔍 Analisi per Fattore")
-    factor_scores = calculate_factor_scores()
+    factor_scores = scores['by_factor']
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -446,40 +519,27 @@ def render_dashboard_page():
     with col3:
         st.metric("Individual", f"{factor_scores['ind']:.2f}/7")
 
-def calculate_scores():
-    """Calcola i punteggi dell'assessment"""
-    questions = load_questions()
-    responses = st.session_state.responses
+def calculate_scores(score_index, resp_arr):
+    """Calcola i punteggi per canale e per fattore dalle somme incrementali in sessione"""
+    # Conta risposte completate (nessuna se le risposte non sono ancora allocate)
+    completed = int(np.count_nonzero(~np.isnan(resp_arr))) if resp_arr is not None else 0
     
-    # Conta risposte completate
-    completed = len([k for k in responses.keys() if k.startswith('q_')])
+    channel_sum = st.session_state.channel_sum
+    channel_count = st.session_state.channel_count
+    factor_sum = st.session_state.factor_sum
+    factor_count = st.session_state.factor_count
     
-    # Calcola punteggi per canale
-    channel_scores = {}
-    
-    for question in questions:
-        channel = question.get('channel', 'Unknown')
-        if channel.startswith('n.'):
-            channel = channel.split(' ', 1)[1] if ' ' in channel else channel
-        
-        response_key = f"q_{questions.index(question)}"
-        if response_key in responses:
-            response = responses[response_key]
-            
-            # Normalizza la risposta su scala 1-7
-            if question['type'] == 'likert':
-                score = response
-            else:  # yes/no
-                score = 7 if response == 'Yes' else 1
-            
-            if channel not in channel_scores:
-                channel_scores[channel] = []
-            channel_scores[channel].append(score)
-    
-    # Calcola medie per canale
+    # Medie per canale (solo canali con almeno una risposta)
     channel_averages = {
-        channel: sum(scores) / len(scores) if scores else 0
-        for channel, scores in channel_scores.items()
+        channel: channel_sum[channel] / channel_count[channel]
+        for channel in score_index['channel_names']
+        if channel_count.get(channel)
+    }
+    
+    # Medie per fattore (0 se nessuna risposta)
+    factor_averages = {
+        factor: factor_sum[factor] / factor_count[factor] if factor_count.get(factor) else 0
+        for factor in FACTOR_KEYS
     }
     
     # Punteggio totale
@@ -488,37 +548,71 @@ def calculate_scores():
     return {
         'total': total_score,
         'by_channel': channel_averages,
+        'by_factor': factor_averages,
         'completed': completed,
-        'total_questions': len(questions)
+        'total_questions': score_index['total_questions']
     }
 
-def calculate_factor_scores():
-    """Calcola i punteggi per fattore"""
-    questions = load_questions()
-    responses = st.session_state.responses
-    
-    factor_scores = {'env': [], 'org': [], 'ind': []}
-    
-    for question in questions:
-        factor = question.get('factor')
-        response_key = f"q_{questions.index(question)}"
-        
-        if factor in factor_scores and response_key in responses:
-            response = responses[response_key]
-            
-            # Normalizza la risposta
-            if question['type'] == 'likert':
-                score = response
-            else:  # yes/no
-                score = 7 if response == 'Yes' else 1
-            
-            factor_scores[factor].append(score)
+def reset_score_totals():
+    """Azzera le somme incrementali dei punteggi (sessione senza risposte)"""
+    st.session_state.channel_sum = defaultdict(float)
+    st.session_state.channel_count = defaultdict(int)
+    st.session_state.factor_sum = defaultdict(float)
+    st.session_state.factor_count = defaultdict(int)
+
+def get_response(question_index):
+    """Restituisce la risposta salvata per una domanda (1-7, 'Yes'/'No' o None)"""
+    resp_arr = st.session_state.get('resp_arr')
+    if resp_arr is None:
+        return None
+    value = resp_arr[question_index]
+    if np.isnan(value):
+        return None
+    if load_score_index()['is_likert'][question_index]:
+        return int(value)
+    return 'Yes' if value == 1 else 'No'
+
+def get_responses_dict():
+    """Risposte e commenti nel formato esportato (chiavi q_<i> e comment_<i>)"""
+    responses = {}
+    if 'resp_arr' not in st.session_state:
+        return responses
+    for i in np.flatnonzero(~np.isnan(st.session_state.resp_arr)).tolist():
+        responses[f"q_{i}"] = get_response(i)
+    for i, comment in enumerate(st.session_state.comments):
+        if comment:
+            responses[f"comment_{i}"] = comment
+    return responses
+
+def record_response(question_index, response):
+    """Salva una risposta aggiornando solo la differenza nelle somme per canale e fattore"""
+    score_index = load_score_index()
+    ensure_response_state(score_index['total_questions'])
+    is_likert = score_index['is_likert'][question_index]
+    scale = score_index['score_scale'][question_index]
+    offset = score_index['score_offset'][question_index]
+    
+    previous = st.session_state.resp_arr[question_index]
+    encoded = _RESPONSE_ENCODERS[int(is_likert)](response)
+    if previous == encoded:
+        return
     
-    # Calcola medie
-    return {
-        factor: sum(scores) / len(scores) if scores else 0
-        for factor, scores in factor_scores.items()
-    }
+    channel = score_index['channel_names'][score_index['channel_ids'][question_index]]
+    factor_id = score_index['factor_ids'][question_index]
+    factor = FACTOR_KEYS[factor_id] if factor_id >= 0 else None
+    
+    for value, sign in ((previous, -1), (encoded, 1)):
+        if np.isnan(value):
+            continue
+        # Normalizza la risposta su scala 1-7 con la mappa precalcolata
+        score = float(value * scale + offset)
+        st.session_state.channel_sum[channel] += sign * score
+        st.session_state.channel_count[channel] += sign
+        if factor is not None:
+            st.session_state.factor_sum[factor] += sign * score
+            st.session_state.factor_count[factor] += sign
+    
+    st.session_state.resp_arr[question_index] = encoded
 
 def get_maturity_level(score):
     """Determina il livello di maturità basato sul punteggio"""
@@ -531,10 +625,14 @@ def get_maturity_level(score):
     else:
         return "Avanzato"
 
+@st.cache_data(show_spinner=False)
 def create_radar_chart(channel_scores):
-    """Crea un grafico radar per i punteggi dei canali"""
-    categories = list(channel_scores.keys())
-    values = list(channel_scores.values())
+    """Crea un grafico radar per i punteggi dei canali (JSON della figura, in cache per punteggi uguali)"""
+    import plotly.graph_objects as go
+    
+    # Array NumPy: Plotly li serializza come typed array binari invece di liste JSON
+    categories = np.asarray(list(channel_scores.keys()))
+    values = np.asarray(list(channel_scores.values()), dtype=np.float32)
     
     fig = go.Figure()
     
@@ -555,13 +653,16 @@ def create_radar_chart(channel_scores):
         title="Punteggi per Canale"
     )
     
-    return fig
+    return fig.to_json()
 
+@st.cache_data(show_spinner=False)
 def create_comparison_chart(user_scores, bologna_scores):
-    """Crea un grafico di confronto con Bologna"""
-    channels = list(user_scores.keys())
-    user_values = list(user_scores.values())
-    bologna_values = [bologna_scores.get(channel, 0) for channel in channels]
+    """Crea un grafico di confronto con Bologna (JSON della figura, in cache per punteggi uguali)"""
+    import plotly.graph_objects as go
+    
+    channels = np.asarray(list(user_scores.keys()))
+    user_values = np.asarray(list(user_scores.values()), dtype=np.float32)
+    bologna_values = np.asarray([bologna_scores.get(channel, 0) for channel in channels], dtype=np.float32)
     
     fig = go.Figure()
     
@@ -587,57 +688,62 @@ def create_comparison_chart(user_scores, bologna_scores):
         yaxis=dict(range=[0, 7])
     )
     
-    return fig
+    return fig.to_json()
 
-def generate_insights(scores, responses):
+def generate_insights(scores):
     """Genera insights basati sui risultati"""
-    total_score = scores['total']
+    return _generate_insights(scores['total'], tuple(scores['by_channel'].items()))
+
+@st.cache_data(show_spinner=False)
+def _generate_insights(total_score, channel_items):
+    """Compone il testo degli insights per un dato insieme di punteggi"""
+    total_display = f"{total_score:.2f}"
     
-    insights = f"""
+    parts = [f"""
     ## 🎯 Executive Summary
     
-    Il tuo punteggio complessivo è **{total_score:.2f}/7**, che corrisponde a un livello di maturità **{get_maturity_level(total_score)}**.
+    Il tuo punteggio complessivo è **{total_display}/7**, che corrisponde a un livello di maturità **{get_maturity_level(total_score)}**.
     
     ### 🔍 Analisi Principale
     
-    """
+    """]
     
     if total_score >= 6.0:
-        insights += """
+        parts.append("""
         **Eccellente!** La tua organizzazione dimostra un alto livello di maturità nella valorizzazione della conoscenza. 
         Continua a mantenere questi standard elevati e considera di diventare un punto di riferimento per altre organizzazioni.
-        """
+        """)
     elif total_score >= 5.0:
-        insights += """
+        parts.append("""
         **Buono!** La tua organizzazione ha una solida base nella valorizzazione della conoscenza. 
         Ci sono opportunità di miglioramento in alcune aree specifiche che potrebbero portare a risultati ancora migliori.
-        """
+        """)
     elif total_score >= 4.0:
-        insights += """
+        parts.append("""
         **In sviluppo.** La tua organizzazione sta costruendo le capacità di valorizzazione della conoscenza. 
         È importante concentrarsi su miglioramenti strutturati e sistematici.
-        """
+        """)
     else:
-        insights += """
+        parts.append("""
         **Fase iniziale.** C'è molto potenziale di crescita nella valorizzazione della conoscenza. 
         Considera di sviluppare una strategia strutturata per migliorare le capacità organizzative.
-        """
+        """)
     
     # Analisi per canale
-    insights += "\n### 📊 Punti di Forza e Aree di Miglioramento\n\n"
+    parts.append("\n### 📊 Punti di Forza e Aree di Miglioramento\n\n")
     
-    sorted_channels = sorted(scores['by_channel'].items(), key=lambda x: x[1], reverse=True)
+    sorted_channels = sorted(channel_items, key=lambda x: x[1], reverse=True)
     
     best_channel = sorted_channels[0]
     worst_channel = sorted_channels[-1]
     
-    insights += f"""
+    parts.append(f"""
     **Punto di forza principale:** {best_channel[0]} (punteggio: {best_channel[1]:.2f})
     
     **Area di miglioramento prioritaria:** {worst_channel[0]} (punteggio: {worst_channel[1]:.2f})
-    """
+    """)
     
-    return insights
+    return "".join(parts)
 
 def main():
     """Funzione principale dell'applicazione"""
@@ -1,22 +1,98 @@
 import json
 import os
+import sqlite3
+import threading
 import pandas as pd
 from datetime import datetime
 from typing import Dict, Any, Optional
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+def _json_default(value: Any) -> Any:
+    """Converte scalari e array NumPy per il fallback su json"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Tipo non serializzabile in JSON: {type(value).__name__}")
+
+
+def _dumps(data: Any, indent: bool = True) -> str:
+    """Serializza in JSON (indentato o compatto, anche tipi NumPy), con orjson se disponibile"""
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option).decode('utf-8')
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False, default=_json_default)
+
+
+def _loads(content: str) -> Any:
+    """Deserializza JSON, con orjson se disponibile"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
 
 class DataManager:
     """
     Gestisce il salvataggio e caricamento dei dati dell'assessment
     """
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", db_name: str = "sessions.db"):
         self.data_dir = data_dir
+        self._data_dir_ok = False
         self.ensure_data_directory()
+        
+        # Un'unica connessione condivisa (l'istanza è in cache tra le sessioni Streamlit)
+        self.db_path = os.path.join(self.data_dir, db_name)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, updated TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        
+        self._import_legacy_sessions()
     
     def ensure_data_directory(self):
         """Assicura che la directory dei dati esista"""
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+        if self._data_dir_ok:
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._data_dir_ok = True
+    
+    def _import_legacy_sessions(self):
+        """Importa nel database le sessioni salvate come file session_<id>.json"""
+        with os.scandir(self.data_dir) as entries:
+            legacy_files = [
+                entry for entry in entries
+                if entry.name.startswith('session_') and entry.name.endswith('.json')
+            ]
+        
+        for entry in legacy_files:
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    data = _loads(f.read())
+                
+                with self._lock:
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO sessions (id, data, updated) VALUES (?, ?, ?)",
+                        (entry.name[8:-5], _dumps(data, indent=False),
+                         data.get('last_updated') or datetime.now().isoformat())
+                    )
+                    self._conn.commit()
+                
+                # Rinomina il file per non reimportarlo (es. dopo delete_session)
+                os.replace(entry.path, entry.path + '.migrated')
+            except Exception as e:
+                print(f"Errore nell'importazione di {entry.name}: {e}")
     
     def save_session_data(self, data: Dict[str, Any], session_id: str) -> bool:
         """
@@ -30,13 +106,15 @@ class DataManager:
             bool: True se il salvataggio è riuscito
         """
         try:
-            file_path = os.path.join(self.data_dir, f"session_{session_id}.json")
-            
             # Aggiungi timestamp
             data['last_updated'] = datetime.now().isoformat()
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (id, data, updated) VALUES (?, ?, ?)",
+                    (session_id, _dumps(data, indent=False), data['last_updated'])
+                )
+                self._conn.commit()
             
             return True
         except Exception as e:
@@ -54,13 +132,15 @@ class DataManager:
             Dict con i dati della sessione o None se non trovata
         """
         try:
-            file_path = os.path.join(self.data_dir, f"session_{session_id}.json")
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT data FROM sessions WHERE id = ?", (session_id,)
+                ).fetchone()
             
-            if not os.path.exists(file_path):
+            if row is None:
                 return None
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return _loads(row[0])
         except Exception as e:
             print(f"Errore nel caricamento: {e}")
             return None
@@ -76,12 +156,14 @@ class DataManager:
         Returns:
             str: Contenuto JSON come stringa
         """
+        content = _dumps(data)
+        
         if filename:
             file_path = os.path.join(self.data_dir, filename)
             with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.write(content)
         
-        return json.dumps(data, indent=2, ensure_ascii=False)
+        return content
     
     def export_to_csv(self, responses: Dict[str, Any], filename: str = None) -> pd.DataFrame:
         """
@@ -94,23 +176,16 @@ class DataManager:
         Returns:
             DataFrame con le risposte
         """
-        # Converte le risposte in DataFrame
-        data_rows = []
+        # Converte le risposte in DataFrame, costruendo direttamente le colonne
+        keys = [k for k in responses if k.startswith('q_')]
+        question_ids = [k[2:] for k in keys]
         
-        for key, value in responses.items():
-            if key.startswith('q_'):
-                question_id = key.replace('q_', '')
-                comment_key = f"comment_{question_id}"
-                comment = responses.get(comment_key, '')
-                
-                data_rows.append({
-                    'question_id': question_id,
-                    'response': value,
-                    'comment': comment,
-                    'timestamp': datetime.now().isoformat()
-                })
-        
-        df = pd.DataFrame(data_rows)
+        df = pd.DataFrame({
+            'question_id': question_ids,
+            'response': [responses[k] for k in keys],
+            'comment': [responses.get(f"comment_{i}", '') for i in question_ids],
+            'timestamp': datetime.now().isoformat()
+        })
         
         if filename:
             file_path = os.path.join(self.data_dir, filename)
@@ -125,17 +200,8 @@ class DataManager:
         Returns:
             Lista degli ID delle sessioni
         """
-        sessions = []
-        
-        if not os.path.exists(self.data_dir):
-            return sessions
-        
-        for filename in os.listdir(self.data_dir):
-            if filename.startswith('session_') and filename.endswith('.json'):
-                session_id = filename.replace('session_', '').replace('.json', '')
-                sessions.append(session_id)
-        
-        return sessions
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM sessions")]
     
     def delete_session(self, session_id: str) -> bool:
         """
@@ -148,13 +214,11 @@ class DataManager:
             bool: True se l'eliminazione è riuscita
         """
         try:
-            file_path = os.path.join(self.data_dir, f"session_{session_id}.json")
-            
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
+            with self._lock:
+                cursor = self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                self._conn.commit()
             
-            return False
+            return cursor.rowcount > 0
         except Exception as e:
             print(f"Errore nell'eliminazione: {e}")
             return False
@@ -170,23 +234,16 @@ class DataManager:
             bool: True se il backup è riuscito
         """
         try:
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
+            os.makedirs(backup_dir, exist_ok=True)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"backup_{timestamp}.json")
-            
-            all_data = {}
-            for session_id in self.get_all_sessions():
-                session_data = self.load_session_data(session_id)
-                if session_data:
-                    all_data[session_id] = session_data
+            backup_file = os.path.join(backup_dir, f"backup_{timestamp}.db")
             
-            with open(backup_file, 'w', encoding='utf-8') as f:
-                json.dump(all_data, f, indent=2, ensure_ascii=False)
+            # Copia consistente dell'intero database in un solo comando
+            with self._lock:
+                self._conn.execute("VACUUM INTO ?", (backup_file,))
             
             return True
         except Exception as e:
             print(f"Errore nel backup: {e}")
             return False
-
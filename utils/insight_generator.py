@@ -1,23 +1,226 @@
-import openai
 import os
-from typing import Dict, List, Any, Optional
+import numpy as np
+import asyncio
+from typing import Dict, List, Any, Optional, Iterator
 import json
 import re
-from textblob import TextBlob
+import time
+import string
+import hashlib
+import threading
+import functools
+from concurrent.futures import Future
+try:
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    VADER_AVAILABLE = True
+except ImportError:
+    VADER_AVAILABLE = False
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+# Soglie di polarità per positivo/negativo: convenzione VADER sul compound score,
+# valori originali per il fallback TextBlob
+POLARITY_THRESHOLD = 0.05 if VADER_AVAILABLE else 0.1
+
+# Parole chiave comuni nel dominio knowledge valorisation
+_DOMAIN_KEYWORDS = (
+    'collaboration', 'partnership', 'innovation', 'research', 'technology',
+    'transfer', 'industry', 'academia', 'university', 'spin-off', 'startup',
+    'intellectual property', 'ip', 'licensing', 'commercialization',
+    'entrepreneurship', 'incubator', 'accelerator', 'funding', 'investment',
+    'skills', 'training', 'mobility', 'exchange', 'network', 'ecosystem',
+    'policy', 'regulation', 'governance', 'framework', 'strategy'
+)
+
+# Prompt AI: istruzioni fisse in testa e dati variabili in coda, così il prefisso
+# resta identico tra le chiamate (prompt caching automatico di OpenAI)
+_SYSTEM_NARRATIVE = (
+    "Sei un esperto in knowledge valorisation e collaborazione industria-accademia. "
+    "Genera insights professionali basati sui dati di assessment."
+)
+_NARRATIVE_PROMPT = string.Template("""Genera un insight narrativo professionale sul canale indicato, basandoti sui dati del self-assessment riportati sotto.
+
+L'insight deve includere:
+1. Analisi della situazione attuale
+2. Identificazione di punti di forza specifici
+3. Sfide e barriere identificate
+4. Opportunità di miglioramento concrete
+5. Raccomandazioni specifiche e attuabili
+
+Stile: Professionale, analitico, simile al caso Bologna.
+Lunghezza: 150-200 parole.
+Lingua: Italiano.
+
+Dati del self-assessment:
+Canale: $channel_name
+Punteggio complessivo: $score/7
+
+Punteggi per fattore:
+- Environmental: $env/7
+- Organizational: $org/7
+- Individual: $ind/7
+
+Sentiment generale: $sentiment
+Polarità: $polarity
+
+Risposte aperte: $open_responses""")
+
+_SYSTEM_EXECUTIVE_SUMMARY = (
+    "Sei un consulente senior specializzato in knowledge valorisation. "
+    "Genera executive summary strategici e actionable."
+)
+_EXECUTIVE_SUMMARY_PROMPT = string.Template("""Genera un executive summary per un assessment di knowledge valorisation con i risultati riportati sotto.
+
+Include:
+1. Valutazione complessiva del livello di maturità
+2. Top 3 punti di forza
+3. Top 3 aree di miglioramento
+4. Raccomandazioni strategiche concrete
+
+Stile: Executive-level, strategico, actionable.
+Lunghezza: 200-250 parole.
+Lingua: Italiano.
+
+Risultati:
+- Punteggio totale: $total_score/7
+- Canale migliore: $best_channel
+- Canale da migliorare: $worst_channel
+- Sentiment generale: $sentiment
+- Performance vs Bologna: $comparison""")
+
+# Cache su disco delle risposte AI: stesso prompt e modello, stessa risposta
+INSIGHT_CACHE_DIR = "./.insight_cache"
+INSIGHT_CACHE_TTL = 604800  # 7 giorni
+
+# Richieste AI in corso per hash del prompt: chiamanti concorrenti con lo stesso
+# prompt attendono lo stesso Future invece di ripetere la chiamata
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _json_default(value: Any) -> Any:
+    """Converte scalari e array NumPy per il fallback su json"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Tipo non serializzabile in JSON: {type(value).__name__}")
+
+
+def _dumps(data: Any) -> str:
+    """Serializza in JSON compatto (anche tipi NumPy), con orjson se disponibile"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    return json.dumps(data, ensure_ascii=False, default=_json_default)
+
+
+def _loads(content: str) -> Any:
+    """Deserializza JSON, con orjson se disponibile"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _argminmax(scores: Dict[str, float]):
+    """Chiavi con valore minimo e massimo in un solo passaggio (a parità, la prima incontrata)"""
+    items = iter(scores.items())
+    key_min, value_min = next(items)
+    key_max, value_max = key_min, value_min
+    for key, value in items:
+        if value < value_min:
+            key_min, value_min = key, value
+        elif value > value_max:
+            key_max, value_max = key, value
+    return key_min, key_max
+
+
+def _build_theme_automaton():
+    """Automa Aho-Corasick: tutte le parole chiave trovate in una sola scansione del testo"""
+    if not AHOCORASICK_AVAILABLE:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in _DOMAIN_KEYWORDS:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+_THEME_AUTOMATON = _build_theme_automaton()
+
+
+@functools.lru_cache(maxsize=32)
+def _extract_themes_cached(text_responses: tuple) -> tuple:
+    """Temi trovati in un insieme di risposte, memorizzati per corpus (es. una chiamata per canale)"""
+    if _THEME_AUTOMATON is not None:
+        # Una scansione per risposta, senza unire l'intero corpus
+        found = set()
+        for text in text_responses:
+            found.update(keyword for _, keyword in _THEME_AUTOMATON.iter(text.lower()))
+    else:
+        combined_text = ' '.join(text_responses).lower()
+        found = {keyword for keyword in _DOMAIN_KEYWORDS if keyword in combined_text}
+    
+    # Temi nell'ordine delle parole chiave del dominio, al massimo 10
+    return tuple(keyword.title() for keyword in _DOMAIN_KEYWORDS if keyword in found)[:10]
+
+
+def _join_inflight(prompt_hash: str):
+    """Restituisce (future, leader): solo il leader deve eseguire la richiesta"""
+    with _inflight_lock:
+        future = _inflight.get(prompt_hash)
+        if future is not None:
+            return future, False
+        future = _inflight[prompt_hash] = Future()
+        return future, True
+
+
+def _leave_inflight(prompt_hash: str):
+    """Rimuove la richiesta completata dall'elenco di quelle in corso"""
+    with _inflight_lock:
+        _inflight.pop(prompt_hash, None)
 
 class InsightGenerator:
     """
     Genera insights narrativi usando AI per l'analisi semantica e del sentiment
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        # Modello leggero di default; per report premium passare model="gpt-4"
+        self.model = model or os.getenv("INSIGHT_MODEL", "gpt-4o-mini")
+        
         self.client = None
+        self.async_client = None
         if api_key or os.getenv('OPENAI_API_KEY'):
             try:
+                # Importato solo se serve: senza chiave si usano i template
+                import openai
                 self.client = openai.OpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
+                # Client asincrono condiviso (pool di connessioni) per le chiamate concorrenti
+                self.async_client = openai.AsyncOpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'))
             except Exception as e:
                 print(f"Errore nell'inizializzazione OpenAI: {e}")
         
+        self.cache = None
+        if DISKCACHE_AVAILABLE:
+            try:
+                self.cache = diskcache.Cache(INSIGHT_CACHE_DIR)
+            except Exception as e:
+                print(f"Cache delle risposte AI non disponibile: {e}")
+        
+        # Analizzatore VADER: lessico caricato alla prima analisi e poi riutilizzato
+        self._vader = None
+        
         self.channels = {
             1: "Joint Research & Co-creation",
             2: "Shared Infrastructure & Resources", 
@@ -43,14 +246,12 @@ class InsightGenerator:
         Returns:
             Dict con le risposte aperte organizzate
         """
-        open_responses = {}
-        
-        for key, value in responses.items():
-            if key.startswith('comment_') and value and value.strip():
-                question_id = key.replace('comment_', '')
-                open_responses[question_id] = value.strip()
-        
-        return open_responses
+        # Il testo viene ripulito una sola volta; le chiavi perdono il prefisso 'comment_'
+        return {
+            key[8:]: stripped
+            for key, value in responses.items()
+            if key[:8] == 'comment_' and value and (stripped := value.strip())
+        }
     
     def perform_sentiment_analysis(self, text_responses: List[str]) -> Dict[str, Any]:
         """
@@ -72,45 +273,28 @@ class InsightGenerator:
                 'neutral_count': 0
             }
         
-        sentiments = []
-        polarities = []
-        subjectivities = []
-        
-        positive_count = 0
-        negative_count = 0
-        neutral_count = 0
+        # Risultati per risposta; NaN per le analisi fallite (escluse dalle medie, contate come neutre)
+        polarities = np.full(len(text_responses), np.nan)
+        subjectivities = np.full(len(text_responses), np.nan)
         
-        for text in text_responses:
+        for i, text in enumerate(text_responses):
             try:
-                blob = TextBlob(text)
-                polarity = blob.sentiment.polarity
-                subjectivity = blob.sentiment.subjectivity
-                
-                polarities.append(polarity)
-                subjectivities.append(subjectivity)
-                
-                if polarity > 0.1:
-                    sentiments.append('positive')
-                    positive_count += 1
-                elif polarity < -0.1:
-                    sentiments.append('negative')
-                    negative_count += 1
-                else:
-                    sentiments.append('neutral')
-                    neutral_count += 1
-                    
+                polarities[i], subjectivities[i] = self._score_sentiment(text)
             except Exception as e:
                 print(f"Errore nell'analisi sentiment: {e}")
-                sentiments.append('neutral')
-                neutral_count += 1
         
-        avg_polarity = sum(polarities) / len(polarities) if polarities else 0.0
-        avg_subjectivity = sum(subjectivities) / len(subjectivities) if subjectivities else 0.0
+        positive_count = int(np.count_nonzero(polarities > POLARITY_THRESHOLD))
+        negative_count = int(np.count_nonzero(polarities < -POLARITY_THRESHOLD))
+        neutral_count = len(text_responses) - positive_count - negative_count
+        
+        scored = ~np.isnan(polarities)
+        avg_polarity = float(polarities[scored].mean()) if scored.any() else 0.0
+        avg_subjectivity = float(subjectivities[scored].mean()) if scored.any() else 0.0
         
         # Determina sentiment generale
-        if avg_polarity > 0.1:
+        if avg_polarity > POLARITY_THRESHOLD:
             overall_sentiment = 'positive'
-        elif avg_polarity < -0.1:
+        elif avg_polarity < -POLARITY_THRESHOLD:
             overall_sentiment = 'negative'
         else:
             overall_sentiment = 'neutral'
@@ -125,6 +309,23 @@ class InsightGenerator:
             'total_responses': len(text_responses)
         }
     
+    def _score_sentiment(self, text: str):
+        """
+        Restituisce (polarità, soggettività) di un testo
+        
+        Con VADER la polarità è il compound score e la soggettività è stimata
+        come quota di testo non neutro (1 - neu).
+        """
+        if VADER_AVAILABLE:
+            if self._vader is None:
+                self._vader = SentimentIntensityAnalyzer()
+            scores = self._vader.polarity_scores(text)
+            return scores['compound'], 1.0 - scores['neu']
+        
+        from textblob import TextBlob
+        sentiment = TextBlob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+    
     def extract_key_themes(self, text_responses: List[str]) -> List[str]:
         """
         Estrae temi chiave dalle risposte testuali
@@ -138,26 +339,7 @@ class InsightGenerator:
         if not text_responses:
             return []
         
-        # Combina tutti i testi
-        combined_text = ' '.join(text_responses).lower()
-        
-        # Parole chiave comuni nel dominio knowledge valorisation
-        domain_keywords = [
-            'collaboration', 'partnership', 'innovation', 'research', 'technology',
-            'transfer', 'industry', 'academia', 'university', 'spin-off', 'startup',
-            'intellectual property', 'ip', 'licensing', 'commercialization',
-            'entrepreneurship', 'incubator', 'accelerator', 'funding', 'investment',
-            'skills', 'training', 'mobility', 'exchange', 'network', 'ecosystem',
-            'policy', 'regulation', 'governance', 'framework', 'strategy'
-        ]
-        
-        # Trova temi presenti
-        found_themes = []
-        for keyword in domain_keywords:
-            if keyword in combined_text:
-                found_themes.append(keyword.title())
-        
-        return found_themes[:10]  # Limita a 10 temi principali
+        return list(_extract_themes_cached(tuple(text_responses)))
     
     def generate_channel_narrative(self, channel_num: int, channel_data: Dict[str, Any], 
                                  open_responses: Dict[str, str], 
@@ -190,54 +372,227 @@ class InsightGenerator:
         Genera narrativa usando OpenAI API
         """
         try:
-            # Prepara il contesto per l'AI
-            context = f"""
-            Canale: {channel_name}
-            Punteggio complessivo: {score:.2f}/7
-            
-            Punteggi per fattore:
-            - Environmental: {factors.get('env', 0):.2f}/7
-            - Organizational: {factors.get('org', 0):.2f}/7
-            - Individual: {factors.get('ind', 0):.2f}/7
+            request = self._narrative_request(channel_name, score, factors, open_responses, sentiment_analysis)
+            return self._cached_chat(self._prompt_hash(request), request)
             
-            Sentiment generale: {sentiment_analysis.get('overall_sentiment', 'neutral')}
-            Polarità: {sentiment_analysis.get('polarity', 0):.2f}
-            
-            Risposte aperte: {'; '.join(open_responses.values()) if open_responses else 'Nessuna risposta aperta'}
-            """
-            
-            prompt = f"""
-            Basandoti sui seguenti dati del self-assessment per il canale "{channel_name}":
-            
-            {context}
-            
-            Genera un insight narrativo professionale che includa:
-            1. Analisi della situazione attuale
-            2. Identificazione di punti di forza specifici
-            3. Sfide e barriere identificate
-            4. Opportunità di miglioramento concrete
-            5. Raccomandazioni specifiche e attuabili
-            
-            Stile: Professionale, analitico, simile al caso Bologna.
-            Lunghezza: 150-200 parole.
-            Lingua: Italiano.
-            """
+        except Exception as e:
+            print(f"Errore nella generazione AI: {e}")
+            return self._generate_template_narrative(channel_name, score, factors, sentiment_analysis)
+    
+    def stream_channel_narrative(self, channel_num: int, channel_data: Dict[str, Any],
+                                 open_responses: Dict[str, str],
+                                 sentiment_analysis: Dict[str, Any]) -> Iterator[str]:
+        """
+        Come generate_channel_narrative, ma restituisce il testo a frammenti man mano
+        che viene generato (utilizzabile con st.write_stream)
+        """
+        channel_name = self.channels[channel_num]
+        score = channel_data['score']
+        factors = channel_data['factors']
+        
+        if self.client:
+            return self._generate_ai_narrative_stream(channel_name, score, factors, open_responses, sentiment_analysis)
+        return iter([self._generate_template_narrative(channel_name, score, factors, sentiment_analysis)])
+    
+    def _generate_ai_narrative_stream(self, channel_name: str, score: float, factors: Dict[str, float],
+                                      open_responses: Dict[str, str],
+                                      sentiment_analysis: Dict[str, Any]) -> Iterator[str]:
+        """
+        Genera narrativa usando OpenAI API in streaming
+        """
+        request = self._narrative_request(channel_name, score, factors, open_responses, sentiment_analysis)
+        prompt_hash = self._prompt_hash(request)
+        
+        content = self._cache_get(prompt_hash)
+        if content is not None:
+            yield content
+            return
+        
+        parts = []
+        try:
+            for chunk in self.client.chat.completions.create(**request, stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            print(f"Errore nella generazione AI: {e}")
+            # Template solo se non è ancora stato mostrato testo
+            if not parts:
+                yield self._generate_template_narrative(channel_name, score, factors, sentiment_analysis)
+            return
+        
+        content = "".join(parts).strip()
+        if not content:
+            # Completamento vuoto: template al posto del testo, niente in cache
+            yield self._generate_template_narrative(channel_name, score, factors, sentiment_analysis)
+            return
+        
+        self._cache_set(prompt_hash, content)
+    
+    async def generate_all_channel_narratives_async(self, channel_data_map: Dict[int, Dict[str, Any]],
+                                                    open_responses: Dict[str, str],
+                                                    sentiment_analysis: Dict[str, Any]) -> Dict[int, str]:
+        """
+        Genera le narrative di tutti i canali con chiamate AI concorrenti
+        
+        Args:
+            channel_data_map: Dati per numero di canale (punteggi, fattori)
+            open_responses: Risposte aperte
+            sentiment_analysis: Analisi del sentiment
             
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Sei un esperto in knowledge valorisation e collaborazione industria-accademia. Genera insights professionali basati sui dati di assessment."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
+        Returns:
+            Dict con la narrativa per numero di canale
+        """
+        channel_nums = list(channel_data_map)
+        
+        if not self.async_client:
+            return {
+                channel_num: self.generate_channel_narrative(
+                    channel_num, channel_data_map[channel_num], open_responses, sentiment_analysis)
+                for channel_num in channel_nums
+            }
+        
+        tasks = [
+            self._generate_ai_narrative_async(
+                self.channels[channel_num], channel_data_map[channel_num]['score'],
+                channel_data_map[channel_num]['factors'], open_responses, sentiment_analysis)
+            for channel_num in channel_nums
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Un errore su un canale non blocca gli altri: si usa il template solo per quel canale
+        narratives = {}
+        for channel_num, result in zip(channel_nums, results):
+            if isinstance(result, BaseException):
+                print(f"Errore nella generazione AI: {result}")
+                channel_data = channel_data_map[channel_num]
+                result = self._generate_template_narrative(
+                    self.channels[channel_num], channel_data['score'], channel_data['factors'], sentiment_analysis)
+            narratives[channel_num] = result
+        
+        return narratives
+    
+    async def _generate_ai_narrative_async(self, channel_name: str, score: float, factors: Dict[str, float],
+                                           open_responses: Dict[str, str], sentiment_analysis: Dict[str, Any]) -> str:
+        """
+        Genera narrativa usando il client OpenAI asincrono
+        """
+        request = self._narrative_request(channel_name, score, factors, open_responses, sentiment_analysis)
+        prompt_hash = self._prompt_hash(request)
+        
+        content = self._cache_get(prompt_hash)
+        if content is not None:
+            return content
+        
+        future, leader = _join_inflight(prompt_hash)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        
+        try:
+            # Il leader precedente può aver salvato la risposta tra il controllo e l'ingresso
+            content = self._cache_get(prompt_hash)
+            if content is not None:
+                future.set_result(content)
+                return content
             
-            return response.choices[0].message.content.strip()
+            response = await self.async_client.chat.completions.create(**request)
+            content = response.choices[0].message.content.strip()
+            self._cache_set(prompt_hash, content)
+            future.set_result(content)
+            return content
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _leave_inflight(prompt_hash)
+    
+    def _prompt_hash(self, request: Dict[str, Any]) -> str:
+        """
+        Chiave di cache: SHA-256 di prompt di sistema, prompt utente e modello
+        """
+        system, user = (message['content'] for message in request['messages'])
+        return hashlib.sha256((system + user + request['model']).encode('utf-8')).hexdigest()
+    
+    def _cached_chat(self, prompt_hash: str, request: Dict[str, Any]) -> str:
+        """
+        Esegue la richiesta chat solo se la risposta non è già in cache né già in corso
+        """
+        content = self._cache_get(prompt_hash)
+        if content is not None:
+            return content
+        
+        future, leader = _join_inflight(prompt_hash)
+        if not leader:
+            return future.result()
+        
+        try:
+            # Il leader precedente può aver salvato la risposta tra il controllo e l'ingresso
+            content = self._cache_get(prompt_hash)
+            if content is not None:
+                future.set_result(content)
+                return content
             
+            response = self.client.chat.completions.create(**request)
+            content = response.choices[0].message.content.strip()
+            self._cache_set(prompt_hash, content)
+            future.set_result(content)
+            return content
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            _leave_inflight(prompt_hash)
+    
+    def _cache_get(self, prompt_hash: str) -> Optional[str]:
+        """Legge una risposta dalla cache su disco (None se assente)"""
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(prompt_hash)
         except Exception as e:
-            print(f"Errore nella generazione AI: {e}")
-            return self._generate_template_narrative(channel_name, score, factors, sentiment_analysis)
+            print(f"Errore nella lettura della cache AI: {e}")
+            return None
+    
+    def _cache_set(self, prompt_hash: str, content: str):
+        """Salva una risposta nella cache su disco con scadenza"""
+        if self.cache is None:
+            return
+        try:
+            self.cache.set(prompt_hash, content, expire=INSIGHT_CACHE_TTL)
+        except Exception as e:
+            print(f"Errore nel salvataggio della cache AI: {e}")
+    
+    def clear_cache(self):
+        """Svuota la cache delle risposte AI"""
+        if self.cache is not None:
+            self.cache.clear()
+    
+    def _narrative_request(self, channel_name: str, score: float, factors: Dict[str, float],
+                           open_responses: Dict[str, str], sentiment_analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Costruisce i parametri della richiesta chat per la narrativa di un canale
+        """
+        prompt = _NARRATIVE_PROMPT.substitute(
+            channel_name=channel_name,
+            score=f"{score:.2f}",
+            env=f"{factors.get('env', 0):.2f}",
+            org=f"{factors.get('org', 0):.2f}",
+            ind=f"{factors.get('ind', 0):.2f}",
+            sentiment=sentiment_analysis.get('overall_sentiment', 'neutral'),
+            polarity=f"{sentiment_analysis.get('polarity', 0):.2f}",
+            open_responses='; '.join(open_responses.values()) if open_responses else 'Nessuna risposta aperta'
+        )
+        
+        return {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": _SYSTEM_NARRATIVE},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 280,  # 150-200 parole
+            'temperature': 0.7
+        }
     
     def _generate_template_narrative(self, channel_name: str, score: float, 
                                    factors: Dict[str, float], sentiment_analysis: Dict[str, Any]) -> str:
@@ -264,8 +619,7 @@ class InsightGenerator:
         ind_score = factors.get('ind', 4.0)
         
         factor_scores = {'Environmental': env_score, 'Organizational': org_score, 'Individual': ind_score}
-        strongest_factor = max(factor_scores, key=factor_scores.get)
-        weakest_factor = min(factor_scores, key=factor_scores.get)
+        weakest_factor, strongest_factor = _argminmax(factor_scores)
         
         # Sentiment
         sentiment = sentiment_analysis.get('overall_sentiment', 'neutral')
@@ -304,26 +658,31 @@ class InsightGenerator:
         Returns:
             str: Executive summary
         """
+        open_responses = self.extract_open_responses(all_responses)
+        sentiment = self.perform_sentiment_analysis(list(open_responses.values()))
+        total_score, best_channel, worst_channel, comparison = self._summary_inputs(all_scores)
+        
+        if self.client:
+            return self._generate_ai_executive_summary(total_score, best_channel, worst_channel, sentiment, comparison)
+        else:
+            return self._generate_template_executive_summary(total_score, best_channel, worst_channel, sentiment, comparison)
+    
+    def _summary_inputs(self, all_scores: Dict[str, Any]):
+        """
+        Ricava punteggio totale, canale migliore/peggiore e confronto con Bologna
+        """
         total_score = all_scores['total_score']
         channels = all_scores['channels']
         
         # Identifica canali migliori e peggiori
         channel_scores = {data['name']: data['score'] for data in channels.values()}
-        best_channel = max(channel_scores, key=channel_scores.get)
-        worst_channel = min(channel_scores, key=channel_scores.get)
-        
-        # Analisi sentiment generale
-        open_responses = self.extract_open_responses(all_responses)
-        sentiment = self.perform_sentiment_analysis(list(open_responses.values()))
+        worst_channel, best_channel = _argminmax(channel_scores)
         
         # Confronto con Bologna
         bologna_score = 5.76
         comparison = "superiore" if total_score > bologna_score else "inferiore" if total_score < bologna_score else "equivalente"
         
-        if self.client:
-            return self._generate_ai_executive_summary(total_score, best_channel, worst_channel, sentiment, comparison)
-        else:
-            return self._generate_template_executive_summary(total_score, best_channel, worst_channel, sentiment, comparison)
+        return total_score, best_channel, worst_channel, comparison
     
     def _generate_template_executive_summary(self, total_score: float, best_channel: str, 
                                            worst_channel: str, sentiment: Dict[str, Any], 
@@ -362,39 +721,129 @@ class InsightGenerator:
         Genera executive summary usando AI
         """
         try:
-            prompt = f"""
-            Genera un executive summary per un assessment di knowledge valorisation con i seguenti risultati:
-            
-            - Punteggio totale: {total_score:.2f}/7
-            - Canale migliore: {best_channel}
-            - Canale da migliorare: {worst_channel}
-            - Sentiment generale: {sentiment.get('overall_sentiment', 'neutral')}
-            - Performance vs Bologna: {comparison}
-            
-            Include:
-            1. Valutazione complessiva del livello di maturità
-            2. Top 3 punti di forza
-            3. Top 3 aree di miglioramento
-            4. Raccomandazioni strategiche concrete
-            
-            Stile: Executive-level, strategico, actionable.
-            Lunghezza: 200-250 parole.
-            Lingua: Italiano.
-            """
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Sei un consulente senior specializzato in knowledge valorisation. Genera executive summary strategici e actionable."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=600,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
+            request = self._executive_summary_request(total_score, best_channel, worst_channel, sentiment, comparison)
+            return self._cached_chat(self._prompt_hash(request), request)
             
         except Exception as e:
             print(f"Errore nella generazione AI executive summary: {e}")
             return self._generate_template_executive_summary(total_score, best_channel, worst_channel, sentiment, comparison)
-
+    
+    def _executive_summary_request(self, total_score: float, best_channel: str,
+                                   worst_channel: str, sentiment: Dict[str, Any],
+                                   comparison: str) -> Dict[str, Any]:
+        """
+        Costruisce i parametri della richiesta chat per l'executive summary
+        """
+        prompt = _EXECUTIVE_SUMMARY_PROMPT.substitute(
+            total_score=f"{total_score:.2f}",
+            best_channel=best_channel,
+            worst_channel=worst_channel,
+            sentiment=sentiment.get('overall_sentiment', 'neutral'),
+            comparison=comparison
+        )
+        
+        return {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": _SYSTEM_EXECUTIVE_SUMMARY},
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': 360,  # 200-250 parole
+            'temperature': 0.7
+        }
+    
+    def generate_report_batch(self, all_scores: Dict[str, Any], all_responses: Dict[str, Any],
+                              poll_interval: float = 30.0) -> Dict[str, Any]:
+        """
+        Genera narrative di tutti i canali ed executive summary con la Batch API di OpenAI
+        
+        Pensato per la produzione offline del report: una sola richiesta sostituisce
+        le chiamate sequenziali (costo per token dimezzato, completamento entro 24h).
+        Per un singolo canale immediato usare generate_channel_narrative.
+        
+        Args:
+            all_scores: Tutti i punteggi calcolati
+            all_responses: Tutte le risposte dell'utente
+            poll_interval: Secondi di attesa tra i controlli dello stato del batch
+            
+        Returns:
+            Dict con 'channels' (narrativa per numero di canale) e 'executive_summary'
+        """
+        open_responses = self.extract_open_responses(all_responses)
+        sentiment = self.perform_sentiment_analysis(list(open_responses.values()))
+        summary_inputs = self._summary_inputs(all_scores)
+        channels = all_scores['channels']
+        
+        # Contenuti generati dal batch per custom_id (None se mancanti)
+        outputs = {}
+        if self.client:
+            requests = {
+                f"channel-{channel_num}": self._narrative_request(
+                    self.channels[channel_num], data['score'], data['factors'], open_responses, sentiment)
+                for channel_num, data in channels.items()
+            }
+            requests['executive-summary'] = self._executive_summary_request(
+                summary_inputs[0], summary_inputs[1], summary_inputs[2], sentiment, summary_inputs[3])
+            
+            try:
+                outputs = self._run_chat_batch(requests, poll_interval)
+            except Exception as e:
+                print(f"Errore nella generazione AI batch: {e}")
+        
+        # Template per le voci non generate dal batch
+        narratives = {}
+        for channel_num, data in channels.items():
+            narratives[channel_num] = outputs.get(f"channel-{channel_num}") or self._generate_template_narrative(
+                self.channels[channel_num], data['score'], data['factors'], sentiment)
+        
+        total_score, best_channel, worst_channel, comparison = summary_inputs
+        executive_summary = outputs.get('executive-summary') or self._generate_template_executive_summary(
+            total_score, best_channel, worst_channel, sentiment, comparison)
+        
+        return {
+            'channels': narratives,
+            'executive_summary': executive_summary
+        }
+    
+    def _run_chat_batch(self, requests: Dict[str, Dict[str, Any]], poll_interval: float) -> Dict[str, str]:
+        """
+        Carica le richieste come JSONL, attende il completamento del batch e ne legge i risultati
+        """
+        lines = [
+            _dumps({
+                'custom_id': custom_id,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': body
+            })
+            for custom_id, body in requests.items()
+        ]
+        input_file = self.client.files.create(
+            file=("report_batch.jsonl", "\n".join(lines).encode('utf-8')),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch.id)
+        
+        if batch.status != 'completed' or not batch.output_file_id:
+            raise RuntimeError(f"batch {batch.id} terminato con stato {batch.status}")
+        
+        # Ogni riga di output riporta il custom_id della richiesta originale
+        outputs = {}
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            result = _loads(line)
+            response = result.get('response') or {}
+            if result.get('error') or response.get('status_code') != 200:
+                continue
+            outputs[result['custom_id']] = response['body']['choices'][0]['message']['content'].strip()
+        
+        return outputs
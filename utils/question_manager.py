@@ -1,7 +1,103 @@
-import pandas as pd
+from __future__ import annotations
+
 import json
 import os
-from typing import List, Dict, Any
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Mapping, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pandas viene importato solo quando si legge il foglio
+    import pandas as pd
+
+ASSESSMENT_SHEET = '1) self-assessment tool'
+LIKERT_COLUMN = '1 - Strongly disagree / Not at all true | 7 - Strongly agree / Fully true'
+YESNO_COLUMN = 'yes/no'
+
+# Solo le colonne usate dall'estrazione, tutte testuali
+QUESTION_COLUMNS = ['ACTORS', 'CHANNELS', 'FACTORS', LIKERT_COLUMN, YESNO_COLUMN]
+QUESTION_DTYPES = {column: 'string' for column in QUESTION_COLUMNS}
+MAX_SHEET_ROWS = 200
+
+# Metadati immutabili condivisi da tutte le domande dello stesso tipo
+_LIKERT_SCALE = (1, 2, 3, 4, 5, 6, 7)
+_LIKERT_SCALE_LABELS = MappingProxyType({
+    1: "Strongly disagree",
+    2: "Disagree",
+    3: "Somewhat disagree",
+    4: "Neutral",
+    5: "Somewhat agree",
+    6: "Agree",
+    7: "Strongly agree"
+})
+_YESNO_OPTIONS = ('Yes', 'No')
+
+_FACTOR_NAMES = {
+    'env': 'Environmental',
+    'org': 'Organizational',
+    'ind': 'Individual'
+}
+
+
+@dataclass(slots=True, frozen=True)
+class Question:
+    """Domanda del self-assessment (immutabile, condivisa tra le sessioni)"""
+    id: str
+    question: str
+    type: str
+    channel: Optional[str]
+    factor: Optional[str]
+    actor: Optional[str]
+    factor_display: Optional[str] = None
+    scale: Tuple[int, ...] = ()
+    scale_labels: Optional[Mapping[int, str]] = field(default=None, hash=False)
+    options: Tuple[str, ...] = ()
+    
+    @classmethod
+    def likert(cls, id: str, question: str, channel: Optional[str], factor: Optional[str],
+               actor: Optional[str]) -> "Question":
+        """Domanda su scala Likert 1-7"""
+        return cls(id, question, 'likert', channel, factor, actor, _FACTOR_NAMES.get(factor, factor),
+                   scale=_LIKERT_SCALE, scale_labels=_LIKERT_SCALE_LABELS)
+    
+    @classmethod
+    def yesno(cls, id: str, question: str, channel: Optional[str], factor: Optional[str],
+              actor: Optional[str]) -> "Question":
+        """Domanda Yes/No"""
+        return cls(id, question, 'yesno', channel, factor, actor, _FACTOR_NAMES.get(factor, factor),
+                   options=_YESNO_OPTIONS)
+    
+    def __reduce__(self):
+        # mappingproxy non è serializzabile con pickle: le etichette viaggiano come dict
+        values = {f.name: getattr(self, f.name) for f in fields(self)}
+        if self.scale_labels is not None:
+            values['scale_labels'] = dict(self.scale_labels)
+        return (_restore_question, (values,))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Rappresentazione come dizionario (formato delle domande per l'export JSON)"""
+        data = {
+            'id': self.id,
+            'question': self.question,
+            'type': self.type,
+            'channel': self.channel,
+            'factor': self.factor,
+            'actor': self.actor
+        }
+        if self.type == 'likert':
+            data['scale'] = list(self.scale)
+            data['scale_labels'] = dict(self.scale_labels)
+        else:
+            data['options'] = list(self.options)
+        return data
+
+
+def _restore_question(values: Dict[str, Any]) -> Question:
+    """Ricostruisce una domanda da pickle, ricollegando le etichette Likert condivise"""
+    if values['scale_labels'] == _LIKERT_SCALE_LABELS:
+        values['scale_labels'] = _LIKERT_SCALE_LABELS
+    return Question(**values)
+
 
 class QuestionManager:
     """Gestisce il caricamento e l'organizzazione delle domande del self-assessment"""
@@ -10,16 +106,35 @@ class QuestionManager:
         self.questions = []
         self.channels = {}
         self.factors = ['env', 'org', 'ind']
+        self._id_index = {}
+        self._all_questions_flat = []
         
-    def load_questions_from_excel(self, file_path: str) -> List[Dict[str, Any]]:
+    def load_questions_from_excel(self, file_path: str, engine: str = 'calamine',
+                                  usecols: Optional[List[str]] = None,
+                                  dtype: Optional[Dict[str, str]] = None,
+                                  nrows: Optional[int] = MAX_SHEET_ROWS) -> List[Question]:
         """Carica tutte le domande reali dal file Excel"""
         try:
             if not os.path.exists(file_path):
                 print(f"File Excel non trovato: {file_path}")
                 return self._get_fallback_questions()
             
-            # Leggi il foglio del self-assessment tool
-            df = pd.read_excel(file_path, sheet_name='1) self-assessment tool')
+            # Il foglio convertito in Parquet evita di rianalizzare l'Excel ad ogni avvio
+            parquet_path = self._sheet_parquet_path(file_path)
+            use_parquet = usecols is None and dtype is None and nrows == MAX_SHEET_ROWS
+            if use_parquet and self._parquet_is_fresh(file_path, parquet_path):
+                import pandas as pd
+                df = pd.read_parquet(parquet_path, engine='pyarrow')
+            elif use_parquet:
+                df = self._convert_excel_to_parquet(file_path, parquet_path, engine)
+            else:
+                # Leggi il foglio del self-assessment tool
+                df = self._read_assessment_sheet(
+                    file_path, engine,
+                    usecols=usecols or QUESTION_COLUMNS,
+                    dtype=dtype or QUESTION_DTYPES,
+                    nrows=nrows
+                )
             
             # Estrai domande con struttura gerarchica
             structured_questions = self._extract_structured_questions(df)
@@ -34,74 +149,93 @@ class QuestionManager:
             print(f"❌ Errore nel caricamento del file Excel: {e}")
             return self._get_fallback_questions()
     
-    def _extract_structured_questions(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _read_assessment_sheet(self, file_path: str, engine: str, **read_kwargs) -> pd.DataFrame:
+        """Legge il foglio del self-assessment, con fallback su openpyxl se il motore non è disponibile"""
+        import pandas as pd
+        try:
+            return pd.read_excel(file_path, sheet_name=ASSESSMENT_SHEET, engine=engine, **read_kwargs)
+        except (ImportError, ValueError) as e:
+            # python-calamine non installato o pandas < 2.2
+            print(f"⚠️ Motore Excel '{engine}' non disponibile ({e}), uso openpyxl")
+            return pd.read_excel(file_path, sheet_name=ASSESSMENT_SHEET, engine='openpyxl', **read_kwargs)
+    
+    def _sheet_parquet_path(self, file_path: str) -> str:
+        """Percorso della copia Parquet del foglio, accanto al file Excel"""
+        return os.path.splitext(file_path)[0] + '.parquet'
+    
+    def _parquet_is_fresh(self, file_path: str, parquet_path: str) -> bool:
+        """True se la copia Parquet esiste ed è più recente del file Excel"""
+        return os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(file_path)
+    
+    def _convert_excel_to_parquet(self, xlsx_path: str, parquet_path: str,
+                                  engine: str = 'calamine') -> pd.DataFrame:
+        """Converte il foglio del self-assessment in Parquet (da eseguire una volta al deploy)"""
+        df = self._read_assessment_sheet(
+            xlsx_path, engine,
+            usecols=QUESTION_COLUMNS,
+            dtype=QUESTION_DTYPES,
+            nrows=MAX_SHEET_ROWS
+        )
+        try:
+            df.to_parquet(parquet_path, engine='pyarrow', index=False)
+        except Exception as e:
+            # La copia è solo un'ottimizzazione: in caso di errore si rilegge l'Excel
+            print(f"⚠️ Impossibile salvare la copia Parquet del foglio: {e}")
+        return df
+    
+    def _extract_structured_questions(self, df: pd.DataFrame) -> List[Question]:
         """Estrae le domande mantenendo la struttura gerarchica"""
         structured_questions = []
         
-        current_channel = None
-        current_factor = None
-        current_actor = None
         question_counter = 0
         
-        for i, row in df.iterrows():
-            # Aggiorna il contesto corrente
-            if pd.notna(row['CHANNELS']) and str(row['CHANNELS']).strip():
-                current_channel = str(row['CHANNELS']).strip()
-            
-            if pd.notna(row['FACTORS']) and str(row['FACTORS']).strip():
-                current_factor = str(row['FACTORS']).strip()
-            
-            if pd.notna(row['ACTORS']) and str(row['ACTORS']).strip():
-                current_actor = str(row['ACTORS']).strip()
+        # Canale/fattore/attore valgono fino alla successiva cella non vuota
+        channels = self._forward_fill_context(df['CHANNELS'])
+        factors = self._forward_fill_context(df['FACTORS'])
+        actors = self._forward_fill_context(df['ACTORS'])
+        
+        # Testi delle domande ripuliti e validi (più di 10 caratteri) calcolati per colonna
+        likert_texts, likert_ok = self._question_texts(df[LIKERT_COLUMN])
+        yesno_texts, yesno_ok = self._question_texts(df[YESNO_COLUMN])
+        
+        # Il ciclo visita solo le righe con almeno una domanda
+        for i in (likert_ok | yesno_ok).nonzero()[0].tolist():
+            channel, factor, actor = channels[i], factors[i], actors[i]
             
             # Estrai domande Likert
-            likert_col = '1 - Strongly disagree / Not at all true | 7 - Strongly agree / Fully true'
-            if pd.notna(row[likert_col]) and str(row[likert_col]).strip() and len(str(row[likert_col]).strip()) > 10:
-                question = {
-                    'id': f"q_{question_counter}",
-                    'question': str(row[likert_col]).strip(),
-                    'type': 'likert',
-                    'channel': current_channel,
-                    'factor': current_factor,
-                    'actor': current_actor,
-                    'scale': [1, 2, 3, 4, 5, 6, 7],
-                    'scale_labels': {
-                        1: "Strongly disagree",
-                        2: "Disagree", 
-                        3: "Somewhat disagree",
-                        4: "Neutral",
-                        5: "Somewhat agree",
-                        6: "Agree",
-                        7: "Strongly agree"
-                    }
-                }
+            if likert_ok[i]:
+                question = Question.likert(f"q_{question_counter}", likert_texts[i], channel, factor, actor)
                 structured_questions.append(question)
                 question_counter += 1
             
             # Estrai domande Yes/No
-            yesno_col = 'yes/no'
-            if pd.notna(row[yesno_col]) and str(row[yesno_col]).strip() and len(str(row[yesno_col]).strip()) > 10:
-                question = {
-                    'id': f"q_{question_counter}",
-                    'question': str(row[yesno_col]).strip(),
-                    'type': 'yesno',
-                    'channel': current_channel,
-                    'factor': current_factor,
-                    'actor': current_actor,
-                    'options': ['Yes', 'No']
-                }
+            if yesno_ok[i]:
+                question = Question.yesno(f"q_{question_counter}", yesno_texts[i], channel, factor, actor)
                 structured_questions.append(question)
                 question_counter += 1
         
         return structured_questions
     
-    def _organize_questions(self, questions: List[Dict[str, Any]]):
+    def _forward_fill_context(self, column: pd.Series) -> List[Optional[str]]:
+        """Propaga in avanti i valori non vuoti di una colonna di contesto (None prima del primo)"""
+        values = column.astype('string').str.strip()
+        values = values.where(values.str.len() > 0).ffill()
+        return values.astype(object).where(values.notna(), None).tolist()
+    
+    def _question_texts(self, column: pd.Series):
+        """Restituisce i testi ripuliti di una colonna domande e la maschera di quelli validi"""
+        texts = column.astype('string').str.strip()
+        valid = texts.str.len().fillna(0).gt(10).to_numpy(dtype=bool)
+        return texts.tolist(), valid
+    
+    def _organize_questions(self, questions: List[Question]):
         """Organizza le domande per canali e fattori"""
         self.channels = {}
+        self._id_index = {}
         
         for question in questions:
-            channel = question['channel']
-            factor = question['factor']
+            channel = question.channel
+            factor = question.factor
             
             if not channel or not factor:
                 continue
@@ -119,6 +253,15 @@ class QuestionManager:
                 }
             
             self.channels[channel]['factors'][factor]['questions'].append(question)
+            self._id_index[question.id] = question
+        
+        # Lista piatta nell'ordine canale/fattore, calcolata una sola volta
+        self._all_questions_flat = [
+            question
+            for channel_data in self.channels.values()
+            for factor_data in channel_data['factors'].values()
+            for question in factor_data['questions']
+        ]
     
     def _clean_channel_name(self, channel: str) -> str:
         """Pulisce il nome del canale per la visualizzazione"""
@@ -131,12 +274,7 @@ class QuestionManager:
     
     def _get_factor_name(self, factor: str) -> str:
         """Converte il codice fattore in nome leggibile"""
-        factor_names = {
-            'env': 'Environmental',
-            'org': 'Organizational', 
-            'ind': 'Individual'
-        }
-        return factor_names.get(factor, factor)
+        return _FACTOR_NAMES.get(factor, factor)
     
     def get_questions_by_channel(self, channel: str) -> Dict[str, Any]:
         """Restituisce tutte le domande per un canale specifico"""
@@ -155,91 +293,60 @@ class QuestionManager:
                 summary[channel][factor] = len(factor_data['questions'])
         return summary
     
-    def get_all_questions(self) -> List[Dict[str, Any]]:
+    def get_all_questions(self) -> List[Question]:
         """Restituisce tutte le domande in una lista piatta"""
-        all_questions = []
-        for channel, channel_data in self.channels.items():
-            for factor, factor_data in channel_data['factors'].items():
-                all_questions.extend(factor_data['questions'])
-        return all_questions
+        return self._all_questions_flat
     
-    def get_question_by_id(self, question_id: str) -> Dict[str, Any]:
+    def get_question_by_id(self, question_id: str) -> Optional[Question]:
         """Restituisce una domanda specifica per ID"""
-        for question in self.get_all_questions():
-            if question['id'] == question_id:
-                return question
-        return None
+        return self._id_index.get(question_id)
     
-    def _get_fallback_questions(self) -> List[Dict[str, Any]]:
+    def _get_fallback_questions(self) -> List[Question]:
         """Domande di fallback se il file Excel non è disponibile"""
         fallback_questions = [
             # Canale 1: Academia-Industry joint research & mobility
-            {
-                'id': 'q_0',
-                'question': 'National/regional policy frameworks effectively support sustained industry–academia co-creation.',
-                'type': 'likert',
-                'channel': 'n.1 Academia-Industry joint research & mobility',
-                'factor': 'env',
-                'actor': 'ACADEMIA incl. research and technology organisations',
-                'scale': [1, 2, 3, 4, 5, 6, 7],
-                'scale_labels': {
-                    1: "Strongly disagree", 2: "Disagree", 3: "Somewhat disagree",
-                    4: "Neutral", 5: "Somewhat agree", 6: "Agree", 7: "Strongly agree"
-                }
-            },
-            {
-                'id': 'q_1',
-                'question': 'Are there formal joint research agreements with industry?',
-                'type': 'yesno',
-                'channel': 'n.1 Academia-Industry joint research & mobility',
-                'factor': 'env',
-                'actor': 'ACADEMIA incl. research and technology organisations',
-                'options': ['Yes', 'No']
-            },
-            {
-                'id': 'q_2',
-                'question': 'IP/data governance policies are adapted to enable equitable sharing in joint R&I.',
-                'type': 'likert',
-                'channel': 'n.1 Academia-Industry joint research & mobility',
-                'factor': 'org',
-                'actor': 'INDUSTRY incl. SMEs and start-ups',
-                'scale': [1, 2, 3, 4, 5, 6, 7],
-                'scale_labels': {
-                    1: "Strongly disagree", 2: "Disagree", 3: "Somewhat disagree",
-                    4: "Neutral", 5: "Somewhat agree", 6: "Agree", 7: "Strongly agree"
-                }
-            },
-            {
-                'id': 'q_3',
-                'question': 'Are research infrastructures co-governed or co-used with industry (e.g. joint labs, testbeds)?',
-                'type': 'yesno',
-                'channel': 'n.1 Academia-Industry joint research & mobility',
-                'factor': 'org',
-                'actor': 'ACADEMIA incl. research and technology organisations',
-                'options': ['Yes', 'No']
-            },
-            {
-                'id': 'q_4',
-                'question': 'Researchers receive training or mentoring for working with industrial partners.',
-                'type': 'likert',
-                'channel': 'n.1 Academia-Industry joint research & mobility',
-                'factor': 'ind',
-                'actor': 'ACADEMIA incl. research and technology organisations',
-                'scale': [1, 2, 3, 4, 5, 6, 7],
-                'scale_labels': {
-                    1: "Strongly disagree", 2: "Disagree", 3: "Somewhat disagree",
-                    4: "Neutral", 5: "Somewhat agree", 6: "Agree", 7: "Strongly agree"
-                }
-            },
-            {
-                'id': 'q_5',
-                'question': 'Are researchers formally authorised to lead or co-lead joint projects with industry?',
-                'type': 'yesno',
-                'channel': 'n.1 Academia-Industry joint research & mobility',
-                'factor': 'ind',
-                'actor': 'ACADEMIA incl. research and technology organisations',
-                'options': ['Yes', 'No']
-            }
+            Question.likert(
+                id='q_0',
+                question='National/regional policy frameworks effectively support sustained industry–academia co-creation.',
+                channel='n.1 Academia-Industry joint research & mobility',
+                factor='env',
+                actor='ACADEMIA incl. research and technology organisations'
+            ),
+            Question.yesno(
+                id='q_1',
+                question='Are there formal joint research agreements with industry?',
+                channel='n.1 Academia-Industry joint research & mobility',
+                factor='env',
+                actor='ACADEMIA incl. research and technology organisations'
+            ),
+            Question.likert(
+                id='q_2',
+                question='IP/data governance policies are adapted to enable equitable sharing in joint R&I.',
+                channel='n.1 Academia-Industry joint research & mobility',
+                factor='org',
+                actor='INDUSTRY incl. SMEs and start-ups'
+            ),
+            Question.yesno(
+                id='q_3',
+                question='Are research infrastructures co-governed or co-used with industry (e.g. joint labs, testbeds)?',
+                channel='n.1 Academia-Industry joint research & mobility',
+                factor='org',
+                actor='ACADEMIA incl. research and technology organisations'
+            ),
+            Question.likert(
+                id='q_4',
+                question='Researchers receive training or mentoring for working with industrial partners.',
+                channel='n.1 Academia-Industry joint research & mobility',
+                factor='ind',
+                actor='ACADEMIA incl. research and technology organisations'
+            ),
+            Question.yesno(
+                id='q_5',
+                question='Are researchers formally authorised to lead or co-lead joint projects with industry?',
+                channel='n.1 Academia-Industry joint research & mobility',
+                factor='ind',
+                actor='ACADEMIA incl. research and technology organisations'
+            )
         ]
         
         # Organizza le domande di fallback
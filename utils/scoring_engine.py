@@ -1,12 +1,76 @@
 import numpy as np
 import pandas as pd
+import copy
+from functools import lru_cache
 from typing import Dict, List, Any, Tuple
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+# Soglie del punteggio totale (ordinate) e livelli di maturità corrispondenti
+# (Iniziale < 4 <= Base < 5 ...); condivise con VisualizationEngine
+MATURITY_THRESHOLDS = np.array([4.0, 5.0, 6.0])
+MATURITY_LEVELS = ('Iniziale', 'Base', 'Intermedio', 'Avanzato')
+
+# Risposte sì/no normalizzate su scala 1-7
+_YESNO_MAP = {'Yes': 7.0, 'No': 1.0}
+
+
+def maturity_index(total_score: float) -> int:
+    """Indice in MATURITY_LEVELS della fascia di maturità del punteggio (soglie <= punteggio)"""
+    return int(np.searchsorted(MATURITY_THRESHOLDS, total_score, side='right'))
+
+
+def _score_batch_loops(vals, channel_idx, factor_idx, n_channels, n_factors):
+    """
+    Medie canale x fattore per ogni riga di vals (R x domande, NaN = non risposta)
+    
+    Scritta a cicli espliciti per la compilazione con numba; le celle senza
+    risposte valgono 4.0 (neutro), come nel calcolo singolo.
+    """
+    n_rows, n_questions = vals.shape
+    out = np.full((n_rows, n_channels, n_factors), 4.0)
+    for r in prange(n_rows):
+        sums = np.zeros((n_channels, n_factors))
+        counts = np.zeros((n_channels, n_factors))
+        for q in range(n_questions):
+            v = vals[r, q]
+            if not np.isnan(v):
+                sums[channel_idx[q], factor_idx[q]] += v
+                counts[channel_idx[q], factor_idx[q]] += 1.0
+        for c in range(n_channels):
+            for f in range(n_factors):
+                if counts[c, f] > 0:
+                    out[r, c, f] = sums[c, f] / counts[c, f]
+    return out
+
+
+if NUMBA_AVAILABLE:
+    _score_batch_kernel = njit(parallel=True, cache=True)(_score_batch_loops)
+else:
+    _score_batch_kernel = None
 
 class ScoringEngine:
     """
     Calcola i punteggi dell'assessment basandosi sulla metodologia Bologna
     """
     
+    # Mapping domande a canali e fattori (semplificato per demo): 54 domande,
+    # 9 per canale, fattori a rotazione, le ultime 6 sì/no. Questo dovrebbe
+    # essere caricato dal file Excel in una versione completa.
+    # Costruito una volta sola e condiviso da tutte le istanze: non modificarlo.
+    QUESTION_MAPPING = {
+        f"q_{i}": {
+            'channel': i // 9 + 1,
+            'factor': ('env', 'org', 'ind')[i % 3],
+            'type': 'likert' if i < 48 else 'yesno'
+        }
+        for i in range(54)
+    }
+    
     def __init__(self):
         self.channels = {
             1: "Joint Research & Co-creation",
@@ -23,31 +87,24 @@ class ScoringEngine:
             'ind': 'Individual (personal, skills)'
         }
         
-        # Mapping domande a canali e fattori (semplificato per demo)
-        self.question_mapping = self._create_question_mapping()
-    
-    def _create_question_mapping(self) -> Dict[str, Dict[str, Any]]:
-        """
-        Crea il mapping delle domande ai canali e fattori
-        Questo dovrebbe essere caricato dal file Excel in una versione completa
-        """
-        mapping = {}
+        self.question_mapping = ScoringEngine.QUESTION_MAPPING
         
-        # Esempio di mapping per le prime domande
-        questions_per_channel = 9  # 54 domande / 6 canali
+        # Tabella indici precalcolata: canale, fattore e tipo di ogni domanda come array NumPy
+        channel_pos = {channel: i for i, channel in enumerate(self.channels)}
+        factor_pos = {factor: i for i, factor in enumerate(self.factors)}
+        self._qids = list(self.question_mapping)
+        self._channel_idx = np.array([channel_pos[m['channel']] for m in self.question_mapping.values()], dtype=np.intp)
+        self._factor_idx = np.array([factor_pos[m['factor']] for m in self.question_mapping.values()], dtype=np.intp)
+        self._is_yesno = np.array([m['type'] == 'yesno' for m in self.question_mapping.values()], dtype=bool)
         
-        for i in range(54):
-            channel = (i // questions_per_channel) + 1
-            factor_index = i % 3
-            factor = ['env', 'org', 'ind'][factor_index]
-            
-            mapping[f"q_{i}"] = {
-                'channel': channel,
-                'factor': factor,
-                'type': 'likert' if i < 48 else 'yesno'
-            }
+        # Domande (id, tipo) raggruppate per coppia (canale, fattore)
+        self._by_cf = {(c, f): [] for c in self.channels for f in self.factors}
+        for qid, m in self.question_mapping.items():
+            self._by_cf[(m['channel'], m['factor'])].append((qid, m['type']))
         
-        return mapping
+        # Cache per istanza: la UI ricalcola spesso con risposte invariate
+        self._calc_cached = lru_cache(maxsize=64)(self._calc_impl)
+        self._insights_cached = lru_cache(maxsize=64)(self._insights_impl)
     
     def normalize_response(self, response: Any, question_type: str) -> float:
         """
@@ -61,16 +118,10 @@ class ScoringEngine:
             float: Valore normalizzato 1-7
         """
         if question_type == 'likert':
-            return float(response) if response is not None else 4.0  # Default neutro
-        elif question_type == 'yesno':
-            if response == 'Yes':
-                return 7.0
-            elif response == 'No':
-                return 1.0
-            else:
-                return 4.0  # Default neutro per risposte mancanti
-        else:
-            return 4.0
+            return 4.0 if response is None else float(response)  # Default neutro
+        if question_type == 'yesno':
+            return _YESNO_MAP.get(response, 4.0)  # Default neutro per risposte mancanti
+        return 4.0
     
     def calculate_factor_score(self, responses: Dict[str, Any], factor: str, channel: int) -> float:
         """
@@ -84,18 +135,13 @@ class ScoringEngine:
         Returns:
             float: Punteggio medio per il fattore
         """
-        relevant_scores = []
-        
-        for question_id, mapping in self.question_mapping.items():
-            if mapping['channel'] == channel and mapping['factor'] == factor:
-                if question_id in responses:
-                    normalized_score = self.normalize_response(
-                        responses[question_id], 
-                        mapping['type']
-                    )
-                    relevant_scores.append(normalized_score)
-        
-        return np.mean(relevant_scores) if relevant_scores else 4.0
+        # Solo le domande della cella richiesta, dall'indice precalcolato
+        scores = [
+            self.normalize_response(responses[qid], question_type)
+            for qid, question_type in self._by_cf.get((channel, factor), ())
+            if qid in responses
+        ]
+        return sum(scores) / len(scores) if scores else 4.0
     
     def calculate_channel_score(self, responses: Dict[str, Any], channel: int) -> Dict[str, float]:
         """
@@ -108,13 +154,14 @@ class ScoringEngine:
         Returns:
             Dict con punteggi per fattore e punteggio medio del canale
         """
-        factor_scores = {}
-        
-        for factor in self.factors.keys():
-            factor_scores[factor] = self.calculate_factor_score(responses, factor, channel)
+        # Solo le celle del canale richiesto (4.0 neutro anche per canali sconosciuti)
+        factor_scores = {
+            factor: self.calculate_factor_score(responses, factor, channel)
+            for factor in self.factors
+        }
         
-        # Calcola il punteggio medio del canale
-        channel_score = np.mean(list(factor_scores.values()))
+        # Calcola il punteggio medio del canale (aritmetica semplice: np.mean costa più dei 3 valori)
+        channel_score = sum(factor_scores.values()) / len(factor_scores)
         
         return {
             'factors': factor_scores,
@@ -131,49 +178,162 @@ class ScoringEngine:
         Returns:
             Dict con tutti i punteggi calcolati
         """
+        # Copia: il risultato in cache resta intatto anche se il chiamante lo modifica
+        return copy.deepcopy(self._calc(responses)[0])
+    
+    def calculate_score_arrays(self, responses: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Gli stessi punteggi di calculate_all_scores come array NumPy in sola lettura
+        
+        Args:
+            responses: Dizionario completo delle risposte
+            
+        Returns:
+            Dict con channel_nums e channel_scores (canali,), factor_matrix (fattori x canali)
+            e factor_summary (fattori,)
+        """
+        return self._calc(responses)[1]
+    
+    def _calc(self, responses: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Punteggi e relativi array, dalla cache per istanza quando le risposte sono hashabili"""
+        try:
+            return self._calc_cached(tuple(sorted(responses.items())))
+        except TypeError:
+            # Risposte non hashabili: calcolo senza cache
+            return self._calc_impl(tuple(responses.items()))
+    
+    def encode_responses(self, responses_list: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Codifica più assessment come matrice densa per calculate_all_scores_batch
+        
+        Args:
+            responses_list: Lista di dizionari delle risposte
+            
+        Returns:
+            Array (R x domande) su scala 1-7, NaN per le domande non presenti
+        """
+        vals = np.full((len(responses_list), len(self._qids)), np.nan)
+        for row, responses in enumerate(responses_list):
+            vals[row] = self._normalized_vector(responses)
+        return vals
+    
+    def calculate_all_scores_batch(self, responses_matrix: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Calcola i punteggi di molti assessment in un colpo solo
+        
+        Usa un kernel compilato con numba se disponibile, altrimenti NumPy.
+        
+        Args:
+            responses_matrix: Array (R x domande) già normalizzato, vedi encode_responses
+            
+        Returns:
+            Dict di array: factor_matrix (R x canali x fattori), channel_scores (R x canali),
+            factors_summary (R x fattori), total_score (R,)
+        """
+        vals = np.asarray(responses_matrix, dtype=np.float64)
+        n_channels, n_factors = len(self.channels), len(self.factors)
+        
+        if NUMBA_AVAILABLE:
+            matrix = _score_batch_kernel(np.ascontiguousarray(vals), self._channel_idx,
+                                         self._factor_idx, n_channels, n_factors)
+        else:
+            # Somme e conteggi per (riga, cella) con un solo bincount sugli indici appiattiti
+            n_rows, n_cells = vals.shape[0], n_channels * n_factors
+            cells = self._channel_idx * n_factors + self._factor_idx
+            flat = (np.arange(n_rows)[:, None] * n_cells + cells).ravel()
+            answered = ~np.isnan(vals).ravel()
+            sums = np.bincount(flat[answered], weights=vals.ravel()[answered], minlength=n_rows * n_cells)
+            counts = np.bincount(flat[answered], minlength=n_rows * n_cells)
+            matrix = np.where(counts > 0, sums / np.maximum(counts, 1), 4.0).reshape(n_rows, n_channels, n_factors)
+        
+        channel_scores = matrix.mean(axis=2)
+        return {
+            'factor_matrix': matrix,
+            'channel_scores': channel_scores,
+            'factors_summary': matrix.mean(axis=1),
+            'total_score': channel_scores.mean(axis=1)
+        }
+    
+    def _calc_impl(self, responses_key: Tuple[Tuple[str, Any], ...]) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Calcola punteggi e array dei punteggi a partire dalle coppie (id domanda, risposta)"""
+        responses = dict(responses_key)
         results = {
             'channels': {},
-            'factors_summary': {factor: [] for factor in self.factors.keys()},
+            'factors_summary': {},
             'total_score': 0.0,
             'response_count': 0,
             'completion_rate': 0.0
         }
         
-        channel_scores = []
+        # Matrice canali x fattori calcolata in un solo passaggio sulle domande;
+        # le medie su 3 e 6 valori usano aritmetica semplice invece di np.mean
+        rows = self._score_matrix(responses).tolist()
+        channel_scores = [sum(row) / len(row) for row in rows]
         
-        # Calcola punteggi per ogni canale
-        for channel_num in self.channels.keys():
-            channel_result = self.calculate_channel_score(responses, channel_num)
-            
+        # Punteggi per ogni canale
+        for channel_num, row, channel_score in zip(self.channels, rows, channel_scores):
             results['channels'][channel_num] = {
                 'name': self.channels[channel_num],
-                'score': channel_result['channel_average'],
-                'factors': channel_result['factors']
+                'score': channel_score,
+                'factors': dict(zip(self.factors, row))
             }
-            
-            channel_scores.append(channel_result['channel_average'])
-            
-            # Aggrega i fattori per il summary
-            for factor, score in channel_result['factors'].items():
-                results['factors_summary'][factor].append(score)
         
         # Calcola punteggio totale
-        results['total_score'] = np.mean(channel_scores)
+        results['total_score'] = sum(channel_scores) / len(channel_scores)
         
         # Calcola statistiche di completamento
         total_questions = len(self.question_mapping)
-        answered_questions = len([r for r in responses.values() if r is not None])
+        answered_questions = sum(1 for r in responses.values() if r is not None)
         results['response_count'] = answered_questions
         results['completion_rate'] = answered_questions / total_questions if total_questions > 0 else 0
         
-        # Calcola medie per fattore
-        for factor in self.factors.keys():
-            if results['factors_summary'][factor]:
-                results['factors_summary'][factor] = np.mean(results['factors_summary'][factor])
-            else:
-                results['factors_summary'][factor] = 4.0
+        # Calcola medie per fattore sui canali
+        results['factors_summary'] = {
+            factor: sum(column) / len(column)
+            for factor, column in zip(self.factors, zip(*rows))
+        }
+        
+        # Stessi punteggi come array NumPy (fattori x canali), tenuti fuori dal
+        # risultato serializzabile; in sola lettura perché condivisi dalla cache
+        arrays = {
+            'channel_nums': np.array(list(self.channels), dtype=np.int64),
+            'channel_scores': np.array(channel_scores, dtype=np.float64),
+            'factor_matrix': np.ascontiguousarray(np.array(rows, dtype=np.float64).T),
+            'factor_summary': np.array(list(results['factors_summary'].values()), dtype=np.float64)
+        }
+        for array in arrays.values():
+            array.flags.writeable = False
+        
+        return results, arrays
+    
+    def _normalized_vector(self, responses: Dict[str, Any]) -> np.ndarray:
+        """Risposte su scala 1-7 nell'ordine delle domande: Yes = 7, No = 1, None o non valida = 4, assente = NaN"""
+        answered = np.array([qid in responses for qid in self._qids], dtype=bool)
+        values = np.array([responses.get(qid) for qid in self._qids], dtype=object)
         
-        return results
+        missing = values == None  # confronto elemento per elemento sull'array
+        likert = np.where(self._is_yesno | missing, 4.0, values).astype(float)
+        yesno = np.where(values == 'Yes', 7.0, np.where(values == 'No', 1.0, 4.0))
+        return np.where(answered, np.where(self._is_yesno, yesno, likert), np.nan)
+    
+    def _score_matrix(self, responses: Dict[str, Any]) -> np.ndarray:
+        """
+        Calcola i punteggi medi per canale (righe) e fattore (colonne)
+        
+        Le domande presenti in responses (anche con valore None) contano nella
+        media; una cella senza domande risposte vale 4.0 (neutro).
+        """
+        answered = np.array([qid in responses for qid in self._qids], dtype=bool)
+        normalized = self._normalized_vector(responses)
+        
+        shape = (len(self.channels), len(self.factors))
+        sums = np.zeros(shape)
+        counts = np.zeros(shape)
+        cells = (self._channel_idx[answered], self._factor_idx[answered])
+        np.add.at(sums, cells, normalized[answered])
+        np.add.at(counts, cells, 1)
+        
+        return np.where(counts > 0, sums / np.maximum(counts, 1), 4.0)
     
     def get_performance_insights(self, scores: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -185,6 +345,14 @@ class ScoringEngine:
         Returns:
             Dict con insights e raccomandazioni
         """
+        channel_items = tuple(
+            (channel_num, channel_data['name'], channel_data['score'])
+            for channel_num, channel_data in scores['channels'].items()
+        )
+        return copy.deepcopy(self._insights_cached(scores['total_score'], channel_items))
+    
+    def _insights_impl(self, total_score: float, channel_items: Tuple[Tuple[int, str, float], ...]) -> Dict[str, Any]:
+        """Genera gli insights da punteggio totale e (numero, nome, punteggio) dei canali"""
         insights = {
             'strengths': [],
             'weaknesses': [],
@@ -193,34 +361,23 @@ class ScoringEngine:
             'maturity_level': ''
         }
         
-        # Identifica punti di forza (punteggi > 6.0)
-        for channel_num, channel_data in scores['channels'].items():
-            if channel_data['score'] > 6.0:
+        # Punti di forza (punteggi > 6.0) e aree di miglioramento (punteggi < 5.0) in un solo passaggio
+        for channel_num, name, score in channel_items:
+            if score > 6.0:
                 insights['strengths'].append({
-                    'channel': channel_data['name'],
-                    'score': channel_data['score'],
-                    'description': f"Eccellente performance in {channel_data['name']}"
+                    'channel': name,
+                    'score': score,
+                    'description': f"Eccellente performance in {name}"
                 })
-        
-        # Identifica aree di miglioramento (punteggi < 5.0)
-        for channel_num, channel_data in scores['channels'].items():
-            if channel_data['score'] < 5.0:
+            elif score < 5.0:
                 insights['weaknesses'].append({
-                    'channel': channel_data['name'],
-                    'score': channel_data['score'],
-                    'description': f"Area di miglioramento in {channel_data['name']}"
+                    'channel': name,
+                    'score': score,
+                    'description': f"Area di miglioramento in {name}"
                 })
         
         # Determina livello di maturità
-        total_score = scores['total_score']
-        if total_score >= 6.0:
-            insights['maturity_level'] = 'Avanzato'
-        elif total_score >= 5.0:
-            insights['maturity_level'] = 'Intermedio'
-        elif total_score >= 4.0:
-            insights['maturity_level'] = 'Base'
-        else:
-            insights['maturity_level'] = 'Iniziale'
+        insights['maturity_level'] = MATURITY_LEVELS[maturity_index(total_score)]
         
         # Confronto con benchmark Bologna (5.76)
         bologna_benchmark = 5.76
@@ -242,20 +399,32 @@ class ScoringEngine:
         Returns:
             DataFrame con i punteggi dettagliati
         """
-        rows = []
+        # Costruzione per colonne: una riga per coppia canale/fattore
+        n_rows = sum(len(channel_data['factors']) for channel_data in scores['channels'].values())
+        channel_numbers = np.empty(n_rows, dtype=np.int64)
+        factor_scores = np.empty(n_rows, dtype=np.float64)
+        channel_scores = np.empty(n_rows, dtype=np.float64)
+        channel_names, factors, factor_names = [], [], []
         
+        k = 0
         for channel_num, channel_data in scores['channels'].items():
             for factor, factor_score in channel_data['factors'].items():
-                rows.append({
-                    'channel_number': channel_num,
-                    'channel_name': channel_data['name'],
-                    'factor': factor,
-                    'factor_name': self.factors[factor],
-                    'factor_score': factor_score,
-                    'channel_score': channel_data['score']
-                })
+                channel_numbers[k] = channel_num
+                factor_scores[k] = factor_score
+                channel_scores[k] = channel_data['score']
+                channel_names.append(channel_data['name'])
+                factors.append(factor)
+                factor_names.append(self.factors[factor])
+                k += 1
         
-        df = pd.DataFrame(rows)
+        df = pd.DataFrame({
+            'channel_number': channel_numbers,
+            'channel_name': channel_names,
+            'factor': factors,
+            'factor_name': factor_names,
+            'factor_score': factor_scores,
+            'channel_score': channel_scores
+        })
         df['total_score'] = scores['total_score']
         
         return df
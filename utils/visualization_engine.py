@@ -1,19 +1,67 @@
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import pandas as pd
 import numpy as np
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
 import io
 import base64
-from typing import Dict, List, Any, Optional
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+try:
+    from .scoring_engine import MATURITY_LEVELS, maturity_index
+except ImportError:
+    # Caricato come modulo semplice (app.py aggiunge utils/ a sys.path)
+    from scoring_engine import MATURITY_LEVELS, maturity_index
+
+FACTOR_KEYS = ('env', 'org', 'ind')
+
+# Punteggio di riferimento Bologna
+BOLOGNA_BENCHMARK = 5.76
+
+# Colore della palette per ogni livello di maturità (stesso ordine di MATURITY_LEVELS)
+_MATURITY_COLOR_KEYS = ('warning', 'secondary', 'primary', 'success')
+
+# Canali ordinati, punteggio per canale e matrice fattori x canali (array in sola lettura)
+ScoreMatrices = namedtuple('ScoreMatrices', ['channels', 'channel_scores', 'factor_matrix'])
+
+
+def _scores_key(scores_data: Dict[str, Any]) -> Tuple:
+    """Chiave immutabile dei punteggi per canale, usata per la cache delle matrici"""
+    return tuple(
+        (channel, channel_data['score'], tuple(sorted(channel_data['factors'].items())))
+        for channel, channel_data in sorted(scores_data['channels'].items())
+    )
+
+
+@lru_cache(maxsize=16)
+def _assemble_matrices(scores_tuple: Tuple) -> ScoreMatrices:
+    """Costruisce una sola volta gli array dei grafici per un dato insieme di punteggi"""
+    channels = tuple(channel for channel, _, _ in scores_tuple)
+    channel_scores = np.array([score for _, score, _ in scores_tuple], dtype=np.float64)
+    factor_matrix = np.array(
+        [[dict(factors).get(factor, 0) for _, _, factors in scores_tuple] for factor in FACTOR_KEYS],
+        dtype=np.float64
+    ).reshape(len(FACTOR_KEYS), len(channels))
+    
+    # Condivisi tra le chiamate: nessuno deve modificarli
+    channel_scores.flags.writeable = False
+    factor_matrix.flags.writeable = False
+    return ScoreMatrices(channels, channel_scores, factor_matrix)
+
+
+def _score_matrices(scores_data: Dict[str, Any]) -> ScoreMatrices:
+    """Array dei grafici per un risultato di calculate_all_scores (dalla cache se già costruiti)"""
+    return _assemble_matrices(_scores_key(scores_data))
+
 
 class VisualizationEngine:
     """
     Crea visualizzazioni e grafici per i risultati dell'assessment
     """
     
+    # Linea benchmark del radar per lo schema standard a 6 canali (condivisa, sola lettura)
+    _BOLOGNA_BENCHMARK_6 = np.full(6, BOLOGNA_BENCHMARK)
+    _BOLOGNA_BENCHMARK_6.flags.writeable = False
+    
     def __init__(self):
         self.color_palette = {
             'primary': '#1f77b4',
@@ -32,6 +80,9 @@ class VisualizationEngine:
             5: "Mobility",
             6: "Ecosystem"
         }
+        
+        # Cache per istanza: Streamlit ridisegna spesso la dashboard con punteggi invariati
+        self._dashboard_cached = lru_cache(maxsize=8)(self._dashboard_impl)
     
     def create_radar_chart(self, channel_scores: Dict[str, float], 
                           title: str = "Punteggi per Canale") -> go.Figure:
@@ -46,10 +97,11 @@ class VisualizationEngine:
             Figura Plotly del radar chart
         """
         # Prepara i dati
-        if isinstance(list(channel_scores.keys())[0], int):
+        if isinstance(next(iter(channel_scores)), int):
             # Se le chiavi sono numeri, usa i nomi abbreviati
-            categories = [self.channels.get(k, f"Channel {k}") for k in sorted(channel_scores.keys())]
-            values = [channel_scores[k] for k in sorted(channel_scores.keys())]
+            sorted_keys = sorted(channel_scores)
+            categories = [self.channels.get(k, f"Channel {k}") for k in sorted_keys]
+            values = [channel_scores[k] for k in sorted_keys]
         else:
             # Se le chiavi sono già nomi
             categories = list(channel_scores.keys())
@@ -64,11 +116,14 @@ class VisualizationEngine:
             fill='toself',
             name='Punteggi',
             line_color=self.color_palette['primary'],
-            fillcolor=f"rgba(31, 119, 180, 0.3)"
+            fillcolor='rgba(31, 119, 180, 0.3)'
         ))
         
         # Aggiungi linea di riferimento per il benchmark Bologna (5.76)
-        bologna_values = [5.76] * len(categories)
+        if len(categories) == 6:
+            bologna_values = self._BOLOGNA_BENCHMARK_6
+        else:
+            bologna_values = np.full(len(categories), BOLOGNA_BENCHMARK)
         fig.add_trace(go.Scatterpolar(
             r=bologna_values,
             theta=categories,
@@ -137,7 +192,7 @@ class VisualizationEngine:
         ])
         
         # Aggiungi linea di riferimento
-        fig.add_hline(y=5.76, line_dash="dash", line_color=self.color_palette['warning'],
+        fig.add_hline(y=BOLOGNA_BENCHMARK, line_dash="dash", line_color=self.color_palette['warning'],
                      annotation_text="Benchmark Bologna")
         
         fig.update_layout(
@@ -168,19 +223,12 @@ class VisualizationEngine:
         Returns:
             Figura Plotly della heatmap
         """
-        # Prepara la matrice
-        channels = sorted(scores_data['channels'].keys())
-        factors = ['env', 'org', 'ind']
+        # Prepara la matrice (condivisa con gli altri grafici)
+        matrices = _score_matrices(scores_data)
+        channels = matrices.channels
+        matrix = matrices.factor_matrix
         factor_names = ['Environmental', 'Organizational', 'Individual']
         
-        matrix = []
-        for factor in factors:
-            row = []
-            for channel in channels:
-                score = scores_data['channels'][channel]['factors'].get(factor, 0)
-                row.append(score)
-            matrix.append(row)
-        
         channel_names = [self.channels.get(c, f"Channel {c}") for c in channels]
         
         fig = go.Figure(data=go.Heatmap(
@@ -190,7 +238,7 @@ class VisualizationEngine:
             colorscale='RdYlBu_r',
             zmin=0,
             zmax=7,
-            text=[[f"{val:.2f}" for val in row] for row in matrix],
+            text=np.char.mod('%.2f', matrix),
             texttemplate="%{text}",
             textfont={"size": 12},
             colorbar=dict(title="Punteggio")
@@ -251,7 +299,7 @@ class VisualizationEngine:
         
         return fig
     
-    def create_benchmark_comparison(self, user_score: float, benchmark_score: float = 5.76,
+    def create_benchmark_comparison(self, user_score: float, benchmark_score: float = BOLOGNA_BENCHMARK,
                                   title: str = "Confronto con Benchmark") -> go.Figure:
         """
         Crea un grafico di confronto con il benchmark
@@ -307,6 +355,10 @@ class VisualizationEngine:
         if not text_responses:
             return None
         
+        # Import locali: wordcloud e PIL si caricano solo al primo uso
+        from wordcloud import WordCloud
+        from PIL import Image, ImageDraw, ImageFont
+        
         # Combina tutti i testi
         combined_text = ' '.join(text_responses)
         
@@ -321,20 +373,23 @@ class VisualizationEngine:
             random_state=42
         ).generate(combined_text)
         
+        # Immagine PIL diretta, senza passare da una figura matplotlib
+        cloud_img = wordcloud.to_image()
+        if title:
+            # Fascia bianca in alto con il titolo centrato
+            font = ImageFont.load_default(size=24)
+            band = 48
+            img = Image.new('RGB', (cloud_img.width, cloud_img.height + band), 'white')
+            img.paste(cloud_img, (0, band))
+            ImageDraw.Draw(img).text((img.width // 2, band // 2), title,
+                                     fill='black', font=font, anchor='mm')
+        else:
+            img = cloud_img
+        
         # Converti in immagine base64
         img_buffer = io.BytesIO()
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        plt.title(title, fontsize=16, pad=20)
-        plt.tight_layout()
-        plt.savefig(img_buffer, format='png', bbox_inches='tight', dpi=150)
-        plt.close()
-        
-        img_buffer.seek(0)
-        img_str = base64.b64encode(img_buffer.read()).decode()
-        
-        return img_str
+        img.save(img_buffer, format='PNG', optimize=True)
+        return base64.b64encode(img_buffer.getvalue()).decode()
     
     def create_maturity_gauge(self, total_score: float,
                             title: str = "Livello di Maturità") -> go.Figure:
@@ -349,18 +404,9 @@ class VisualizationEngine:
             Figura Plotly del gauge
         """
         # Determina il livello di maturità
-        if total_score >= 6.0:
-            level = "Avanzato"
-            color = self.color_palette['success']
-        elif total_score >= 5.0:
-            level = "Intermedio"
-            color = self.color_palette['primary']
-        elif total_score >= 4.0:
-            level = "Base"
-            color = self.color_palette['secondary']
-        else:
-            level = "Iniziale"
-            color = self.color_palette['warning']
+        idx = maturity_index(total_score)
+        level = MATURITY_LEVELS[idx]
+        color = self.color_palette[_MATURITY_COLOR_KEYS[idx]]
         
         fig = go.Figure(go.Indicator(
             mode = "gauge+number",
@@ -379,7 +425,7 @@ class VisualizationEngine:
                 'threshold': {
                     'line': {'color': "red", 'width': 4},
                     'thickness': 0.75,
-                    'value': 5.76  # Benchmark Bologna
+                    'value': BOLOGNA_BENCHMARK
                 }
             }
         ))
@@ -396,12 +442,36 @@ class VisualizationEngine:
         """
         Crea una dashboard riassuntiva con multiple visualizzazioni
         
+        Con punteggi invariati riparte dalla figura già costruita e ne restituisce
+        una copia, che il chiamante può modificare liberamente.
+        
         Args:
             scores_data: Dati completi dei punteggi
             
         Returns:
             Figura Plotly con subplot multipli
         """
+        matrices = _score_matrices(scores_data)
+        factors_summary = scores_data['factors_summary']
+        factor_scores = [factors_summary[f] for f in FACTOR_KEYS]
+        
+        cached_fig = self._dashboard_cached(
+            matrices.channels,
+            tuple(matrices.channel_scores.tolist()),
+            tuple(factor_scores),
+            scores_data['total_score']
+        )
+        return go.Figure(cached_fig)
+    
+    def _dashboard_impl(self, channels: Tuple, channel_scores: Tuple[float, ...],
+                        factor_scores: Tuple[float, ...], total_score: float) -> go.Figure:
+        """Costruisce la dashboard riassuntiva a partire dai punteggi in forma hashable"""
+        palette = self.color_palette
+        primary = palette['primary']
+        secondary = palette['secondary']
+        success = palette['success']
+        warning = palette['warning']
+        
         # Crea subplot
         fig = make_subplots(
             rows=2, cols=2,
@@ -412,34 +482,30 @@ class VisualizationEngine:
         )
         
         # 1. Bar chart canali
-        channels = sorted(scores_data['channels'].keys())
         channel_names = [self.channels.get(c, f"Ch{c}") for c in channels]
-        channel_scores = [scores_data['channels'][c]['score'] for c in channels]
         
         fig.add_trace(
-            go.Bar(x=channel_names, y=channel_scores, name="Canali",
-                  marker_color=self.color_palette['primary']),
+            go.Bar(x=channel_names, y=list(channel_scores), name="Canali",
+                  marker_color=primary),
             row=1, col=1
         )
         
         # 2. Bar chart fattori
         factor_names = ['Environmental', 'Organizational', 'Individual']
-        factor_scores = [scores_data['factors_summary'][f] for f in ['env', 'org', 'ind']]
         
         fig.add_trace(
-            go.Bar(x=factor_names, y=factor_scores, name="Fattori",
-                  marker_color=self.color_palette['secondary']),
+            go.Bar(x=factor_names, y=list(factor_scores), name="Fattori",
+                  marker_color=secondary),
             row=1, col=2
         )
         
         # 3. Gauge maturità
-        total_score = scores_data['total_score']
         fig.add_trace(
             go.Indicator(
                 mode="gauge+number",
                 value=total_score,
                 gauge={'axis': {'range': [0, 7]},
-                      'bar': {'color': self.color_palette['success']},
+                      'bar': {'color': success},
                       'steps': [{'range': [0, 4], 'color': "lightgray"},
                                {'range': [4, 7], 'color': "lightgreen"}]},
                 title={'text': "Maturità"}
@@ -449,8 +515,8 @@ class VisualizationEngine:
         
         # 4. Confronto benchmark
         fig.add_trace(
-            go.Bar(x=['Tuo Score', 'Bologna'], y=[total_score, 5.76],
-                  marker_color=[self.color_palette['primary'], self.color_palette['warning']],
+            go.Bar(x=['Tuo Score', 'Bologna'], y=[total_score, BOLOGNA_BENCHMARK],
+                  marker_color=[primary, warning],
                   name="Benchmark"),
             row=2, col=2
         )